@@ -0,0 +1,81 @@
+"""FileInfoCache 的性能测试
+
+在临时目录中创建若干文件，分别测量逐条读写与批量读写的耗时。
+
+    python benchmarks/bench_file_info_cache.py [文件数]
+"""
+
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from cx_studio.filesystem import FileInfoCache
+
+
+def make_files(folder: Path, count: int) -> list[Path]:
+    result = []
+    for i in range(count):
+        path = folder / f"{i:06d}.bin"
+        path.write_bytes(b"x")
+        result.append(path)
+    return result
+
+
+def measure(name: str, count: int, func: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{elapsed * 1000:>10.1f} ms{count / elapsed:>12.0f} ops/s")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as folder:
+        files = make_files(Path(folder), count)
+        info = {"duration": 123456, "streams": ["Stream #0:0: Video: h264"]}
+
+        cache = FileInfoCache(Path(folder) / "single.db")
+        measure(
+            "set (per call)", count, lambda: [cache.set(f, "info", info) for f in files]
+        )
+        measure("get (per call)", count, lambda: [cache.get(f, "info") for f in files])
+        cache.close()
+
+        cache = FileInfoCache(Path(folder) / "bulk.db")
+        measure(
+            "set_many", count, lambda: cache.set_many("info", {f: info for f in files})
+        )
+        measure("get_many", count, lambda: cache.get_many(files, "info"))
+        measure(
+            "update_many",
+            count,
+            lambda: cache.update_many({f: {"size": 1} for f in files}),
+        )
+        cache.close()
+
+        # 同一批文件被反复查询时内存层的效果
+        for memory_size in (0, count):
+            cache = FileInfoCache(Path(folder) / "bulk.db", memory_size=memory_size)
+            cache.get_many(files, "info")
+            measure(
+                f"get x3 (memory={memory_size})",
+                count * 3,
+                lambda: [cache.get(f, "info") for _i in range(3) for f in files],
+            )
+            cache.close()
+
+        cache = FileInfoCache(
+            Path(folder) / "back.db", memory_size=count, write_mode="back"
+        )
+        measure(
+            "set (write-back)",
+            count,
+            lambda: [cache.set(f, "info", info) for f in files],
+        )
+        measure("close (write-back)", count, cache.close)
+
+
+if __name__ == "__main__":
+    main()
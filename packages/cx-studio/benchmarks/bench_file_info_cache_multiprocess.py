@@ -0,0 +1,97 @@
+"""FileInfoCache 的多进程压力测试
+
+多个进程同时对同一个数据库反复读写同一批文件，
+统计总吞吐量与出错次数，最后检查各进程写入的字段是否都被保留。
+
+    python benchmarks/bench_file_info_cache_multiprocess.py [进程数] [每个进程的操作数]
+"""
+
+import multiprocessing
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from cx_studio.filesystem import FileInfoCache
+
+FILE_COUNT = 200
+
+
+def make_files(folder: Path, count: int) -> list[Path]:
+    result = []
+    for i in range(count):
+        path = folder / f"{i:06d}.bin"
+        path.write_bytes(b"x")
+        result.append(path)
+    return result
+
+
+def worker(
+    db_path: Path, files: list[Path], worker_id: int, operations: int
+) -> tuple[int, int, dict[Path, int]]:
+    """交替执行读取、单字段写入与批量写入
+
+    返回 (完成的操作数, 出错次数, 每个文件最后写入的值)
+    """
+    rng = random.Random(worker_id)
+    cache = FileInfoCache(db_path, flush_threshold=64)
+    done = errors = 0
+    written: dict[Path, int] = {}
+    for i in range(operations):
+        path = rng.choice(files)
+        try:
+            action = rng.random()
+            if action < 0.6:
+                cache.get(path, "owner")
+            elif action < 0.9:
+                # 每个进程写自己的字段，合并写入不应丢失其他进程的字段
+                cache.set(path, f"worker{worker_id}", i)
+                written[path] = i
+            else:
+                batch = rng.sample(files, 20)
+                cache.set_many(f"worker{worker_id}", {x: i for x in batch})
+                written.update({x: i for x in batch})
+            done += 1
+        except sqlite3.Error:
+            errors += 1
+    cache.close()
+    return done, errors, written
+
+
+def main() -> None:
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as folder:
+        files = make_files(Path(folder), FILE_COUNT)
+        db_path = Path(folder) / "shared.db"
+        FileInfoCache(db_path).set_many("owner", {f: "main" for f in files})
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(
+                worker,
+                [(db_path, files, n, operations) for n in range(processes)],
+            )
+        elapsed = time.perf_counter() - start
+
+        done = sum(x[0] for x in results)
+        errors = sum(x[1] for x in results)
+        cache = FileInfoCache(db_path)
+        lost = sum(1 for f in files if cache.get(f, "owner") != "main")
+        for n, (_done, _errors, written) in enumerate(results):
+            fields = cache.get_many(written, f"worker{n}")
+            lost += sum(1 for f, v in written.items() if fields.get(f) != v)
+        cache.close()
+
+        print(f"processes        {processes:>10}")
+        print(f"operations       {done:>10}")
+        print(f"elapsed          {elapsed * 1000:>10.1f} ms")
+        print(f"throughput       {done / elapsed:>10.0f} ops/s")
+        print(f"errors           {errors:>10}")
+        print(f"lost fields      {lost:>10}")
+
+
+if __name__ == "__main__":
+    main()
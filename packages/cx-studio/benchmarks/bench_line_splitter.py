@@ -0,0 +1,89 @@
+"""StreamUtils.readlines_from_stream 的性能测试
+
+对比每次都对整个缓冲区执行 split 的旧实现与只扫描新数据的 LineSplitter。
+
+    python benchmarks/bench_line_splitter.py
+"""
+
+import io
+import os
+import re
+import time
+from collections.abc import Callable, Iterable
+from typing import IO
+
+from cx_studio.iotools import StreamUtils
+
+
+def legacy_readlines_from_stream(stream: IO[bytes]) -> Iterable[bytes]:
+    pattern = re.compile(rb"[\r\n]+")
+
+    buffer = bytearray()
+    for chunk in StreamUtils.read_stream(stream, io.DEFAULT_BUFFER_SIZE):
+        buffer.extend(chunk)
+
+        lines = pattern.split(buffer)
+        buffer[:] = lines.pop(-1)  # keep the last line that could be partial
+
+        yield from lines
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def make_stderr(lines: int) -> bytes:
+    status = b"frame=  123 fps= 25 q=28.0 size=    1024KiB time=00:00:05.00 bitrate=1677.7kbits/s speed=1.01x\r"
+    banner = b"  Stream #0:0[0x1](und): Video: h264 (High), yuv420p, 1280x720, 25 fps\n"
+    return (banner * 40) + status * lines
+
+
+def make_long_line(size: int) -> bytes:
+    return b"x" * size + b"\n"
+
+
+def make_noise(size: int) -> bytes:
+    # 几乎没有换行的二进制数据
+    return os.urandom(size).replace(b"\n", b"").replace(b"\r", b"")
+
+
+CASES: dict[str, bytes] = {
+    "ffmpeg stderr": make_stderr(50000),
+    "1 MiB line": make_long_line(1024 * 1024),
+    "4 MiB line": make_long_line(4 * 1024 * 1024),
+    "4 MiB noise": make_noise(4 * 1024 * 1024),
+}
+
+
+def measure(func: Callable[[IO[bytes]], Iterable[bytes]], data: bytes) -> float:
+    best = float("inf")
+    for _i in range(3):
+        start = time.perf_counter()
+        for _line in func(io.BytesIO(data)):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_consistency() -> None:
+    for data in (CASES["ffmpeg stderr"][:200000], b"a\r\nb\n\nc", b"tail"):
+        legacy = [x for x in legacy_readlines_from_stream(io.BytesIO(data)) if x]
+        current = list(
+            StreamUtils.readlines_from_stream(io.BytesIO(data), max_line_length=1 << 30)
+        )
+        assert legacy == current
+
+
+def main() -> None:
+    check_consistency()
+    print(f"{'case':<16}{'size':>10}{'legacy ms':>12}{'current ms':>12}{'speedup':>10}")
+    for name, data in CASES.items():
+        legacy = measure(legacy_readlines_from_stream, data)
+        current = measure(StreamUtils.readlines_from_stream, data)
+        print(
+            f"{name:<16}{len(data) / 1024:>9.0f}K{legacy * 1000:>12.1f}"
+            f"{current * 1000:>12.1f}{legacy / current:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
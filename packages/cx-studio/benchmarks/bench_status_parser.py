@@ -0,0 +1,121 @@
+"""FFmpegCodingInfo.parse_status_line 的性能测试
+
+对比逐字段 re.search 的旧实现与单次扫描的新实现，
+并估算多个 ffmpeg 进程同时输出状态时解析所占用的 CPU 时间。
+
+    python benchmarks/bench_status_parser.py [进程数]
+"""
+
+import re
+import sys
+import timeit
+from typing import Any
+
+from cx_studio.core import CxTime, FileSize
+from cx_studio.ffmpeg.cx_ff_infos import FFmpegCodingInfo
+
+SAMPLE_LINES = [
+    "ffmpeg version 7.0.2-static https://johnvansickle.com/ffmpeg/  Copyright (c) 2000-2024 the FFmpeg developers",
+    "  built with gcc 8 (Debian 8.3.0-6)",
+    "Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'input.mp4':",
+    "  Duration: 00:02:00.00, start: 0.000000, bitrate: 1201 kb/s",
+    "  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p, 1280x720, 1067 kb/s, 25 fps",
+    "    Metadata:",
+    "      handler_name    : VideoHandler",
+    "[libx264 @ 0x5580] using cpu capabilities: MMX2 SSE2Fast SSSE3 SSE4.2 AVX FMA3 BMI2 AVX2",
+    "frame=  123 fps= 25 q=28.0 size=    1024KiB time=00:00:05.00 bitrate=1677.7kbits/s speed=1.01x",
+    "frame= 2999 fps=211 q=-1.0 Lsize=   17580KiB time=00:01:59.96 bitrate=1200.5kbits/s speed=8.44x",
+    "frame=    0 fps=0.0 q=0.0 size=       0KiB time=N/A bitrate=N/A speed=N/A",
+]
+
+# 实际转码时绝大多数行是状态行
+STATUS_HEAVY_LINES = SAMPLE_LINES[:4] + SAMPLE_LINES[8:10] * 48
+
+
+def legacy_parse_status_line(line: str) -> dict[str, Any]:
+    datas: dict[str, Any] = {"raw_input": line.strip()}
+
+    duration_match = re.search(r"Duration:\s*(?P<duration>\d+:\d+:\d+[:;.,]\d+)", line)
+    if duration_match:
+        datas["total_time"] = CxTime.from_timestamp(duration_match.group("duration"))
+
+    frames_match = re.search(r"frame=\s*(?P<frames>\d+)", line)
+    if frames_match:
+        datas["current_frame"] = int(frames_match.group("frames"))
+
+    fps_match = re.search(r"fps=\s*(?P<fps>\d+(\.\d+)?)", line)
+    if fps_match:
+        datas["current_fps"] = float(fps_match.group("fps"))
+
+    q_match = re.search(r"q=\s*(?P<q>-?\d+(\.\d+)?)", line)
+    if q_match:
+        datas["current_q"] = float(q_match.group("q"))
+
+    size_match = re.search(r"L?size=\s*(?P<size>\d+(\.\d+)?\s*\w+)", line)
+    if size_match:
+        datas["current_size"] = FileSize.from_string(size_match.group("size"))
+
+    time_match = re.search(r"time=\s*(?P<time>\d+:\d+:\d+[:;.,]\d+)", line)
+    if time_match:
+        datas["current_time"] = CxTime.from_timestamp(time_match.group("time"))
+
+    bitrate_match = re.search(r"bitrate=\s*(?P<bitrate>\d+(\.\d+)?\s*\w+)/s", line)
+    if bitrate_match:
+        datas["current_bitrate"] = FileSize.from_string(bitrate_match.group("bitrate"))
+
+    speed_match = re.search(r"speed=\s*(?P<speed>\d+(\.\d+)?)x", line)
+    if speed_match:
+        datas["current_speed"] = float(speed_match.group("speed"))
+
+    return datas
+
+
+def _comparable(datas: dict[str, Any]) -> dict[str, Any]:
+    result = {}
+    for key, value in datas.items():
+        if isinstance(value, FileSize):
+            value = value.total_bytes
+        elif isinstance(value, CxTime):
+            value = value.total_milliseconds
+        result[key] = value
+    return result
+
+
+def check_consistency() -> None:
+    for line in SAMPLE_LINES:
+        legacy = _comparable(legacy_parse_status_line(line))
+        current = _comparable(FFmpegCodingInfo.parse_status_line(line))
+        assert legacy == current, f"{line!r}\n{legacy}\n{current}"
+
+
+def measure(func, lines: list[str], repeat: int = 5) -> float:
+    """返回每行的平均解析耗时（微秒）"""
+    number = max(1, 20000 // len(lines))
+    best = min(
+        timeit.repeat(lambda: [func(x) for x in lines], number=number, repeat=repeat)
+    )
+    return best / (number * len(lines)) * 1e6
+
+
+def main() -> None:
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    # ffmpeg 默认每 0.5 秒输出一次状态
+    lines_per_second = processes * 2
+
+    check_consistency()
+    print(f"{'lines':<16}{'legacy µs/line':>16}{'current µs/line':>18}{'speedup':>10}")
+    for name, lines in (("mixed", SAMPLE_LINES), ("status heavy", STATUS_HEAVY_LINES)):
+        legacy = measure(legacy_parse_status_line, lines)
+        current = measure(FFmpegCodingInfo.parse_status_line, lines)
+        print(f"{name:<16}{legacy:>16.2f}{current:>18.2f}{legacy / current:>9.1f}x")
+
+    current = measure(FFmpegCodingInfo.parse_status_line, STATUS_HEAVY_LINES)
+    share = current * lines_per_second / 1e6 * 100
+    print(
+        f"\n{processes} processes at {lines_per_second} status lines/s "
+        f"use {share:.3f}% of one core for parsing"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import re
 from typing import Literal
 
+_SIZE_STRING_PATTERN = re.compile(
+    r"(?P<number>\d+\.?\d*)\s*(?P<unit>[kmgtpebits]+)?", re.IGNORECASE
+)
+
 
 class FileSize:
     Standard = Literal["binary", "international"]
@@ -102,14 +106,11 @@ class FileSize:
 
     @classmethod
     def from_string(cls, string: str):
-        pattern = re.compile(
-            r"(?P<number>\d+\.?\d*)\s*(?P<unit>[kmgtpebits]+)?", re.IGNORECASE
-        )
-        match = pattern.search(string)
+        match = _SIZE_STRING_PATTERN.search(string)
         if not match:
             raise ValueError(f'Invalid string format: "{string}".')
         number = float(match.group("number"))
-        unit = match.group("unit").upper()
+        unit = (match.group("unit") or "").upper()
         if unit.startswith("K"):
             return cls.from_kilobytes(number)
         elif unit.startswith("M"):
@@ -5,7 +5,7 @@ from cx_studio.i18n import _
 
 
 class CxTime:
-    __TC_PATTERN = r"(\d{2}):(\d{2}):(\d{2})[:;.,](\d+)"
+    __TC_PATTERN = re.compile(r"(\d{2}):(\d{2}):(\d{2})[:;.,](\d+)")
 
     def __init__(self, milliseconds: int):
         self.__milliseconds = int(milliseconds)
@@ -162,7 +162,7 @@ class CxTime:
 
     @classmethod
     def from_timestamp(cls, ts: str):
-        match = re.match(CxTime.__TC_PATTERN, ts)
+        match = CxTime.__TC_PATTERN.match(ts)
         if not match:
             raise ValueError(f"Invalid timestamp format: {ts}")
         hours = int(match.group(1))
@@ -173,7 +173,7 @@ class CxTime:
 
     @classmethod
     def from_timecode(cls, tc: str, timebase: Timebase):
-        match = re.match(CxTime.__TC_PATTERN, tc)
+        match = CxTime.__TC_PATTERN.match(tc)
         if not match:
             raise ValueError(f"Invalid timecode format: {tc}")
         hours = int(match.group(1))
@@ -1,5 +1,7 @@
 from .cx_ff_errors import *
 from .cx_ff_filepath_preprocessor import *
 from .cx_ff_infos import *
+from .cx_ff_progress import *
+from .cx_ff_registry import *
 from .cx_ffmpeg import *
 from .cx_ffmpeg_async import *
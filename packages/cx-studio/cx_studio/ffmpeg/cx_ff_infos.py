@@ -1,4 +1,5 @@
 import re
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -7,6 +8,31 @@ from typing import Any, Self
 
 from cx_studio.core import CxTime, FileSize
 
+_STATUS_TOKEN_PATTERN = re.compile(r"(\w+)=\s*(\S+)")
+_DURATION_PATTERN = re.compile(r"Duration:\s*(?P<duration>\d+:\d+:\d+[:;.,]\d+)")
+
+
+def _strip_suffix(value: str, suffix: str) -> str:
+    if not value.endswith(suffix):
+        raise ValueError(f"Invalid value: {value}")
+    return value[: -len(suffix)]
+
+
+# 状态行中的键与 FFmpegCodingInfo 字段及其转换函数的对应关系
+_STATUS_FIELD_PARSERS: dict[str, tuple[str, Callable[[str], Any]]] = {
+    "frame": ("current_frame", int),
+    "fps": ("current_fps", float),
+    "q": ("current_q", float),
+    "size": ("current_size", FileSize.from_string),
+    "Lsize": ("current_size", FileSize.from_string),
+    "time": ("current_time", CxTime.from_timestamp),
+    "bitrate": (
+        "current_bitrate",
+        lambda x: FileSize.from_string(_strip_suffix(x, "/s")),
+    ),
+    "speed": ("current_speed", lambda x: float(_strip_suffix(x, "x"))),
+}
+
 
 @dataclass(frozen=True)
 class FFmpegFormatInfo:
@@ -73,43 +99,22 @@ class FFmpegCodingInfo:
     def parse_status_line(line: str) -> dict[str, Any]:
         datas: dict[str, Any] = {"raw_input": line.strip()}
 
-        duration_match = re.search(
-            r"Duration:\s*(?P<duration>\d+:\d+:\d+[:;.,]\d+)", line
-        )
-        if duration_match:
-            datas["total_time"] = CxTime.from_timestamp(
-                duration_match.group("duration")
-            )
-
-        frames_match = re.search(r"frame=\s*(?P<frames>\d+)", line)
-        if frames_match:
-            datas["current_frame"] = int(frames_match.group("frames"))
-
-        fps_match = re.search(r"fps=\s*(?P<fps>\d+(\.\d+)?)", line)
-        if fps_match:
-            datas["current_fps"] = float(fps_match.group("fps"))
-
-        q_match = re.search(r"q=\s*(?P<q>-?\d+(\.\d+)?)", line)
-        if q_match:
-            datas["current_q"] = float(q_match.group("q"))
-
-        size_match = re.search(r"L?size=\s*(?P<size>\d+(\.\d+)?\s*\w+)", line)
-        if size_match:
-            datas["current_size"] = FileSize.from_string(size_match.group("size"))
-
-        time_match = re.search(r"time=\s*(?P<time>\d+:\d+:\d+[:;.,]\d+)", line)
-        if time_match:
-            datas["current_time"] = CxTime.from_timestamp(time_match.group("time"))
-
-        bitrate_match = re.search(r"bitrate=\s*(?P<bitrate>\d+(\.\d+)?\s*\w+)/s", line)
-        if bitrate_match:
-            datas["current_bitrate"] = FileSize.from_string(
-                bitrate_match.group("bitrate")
-            )
-
-        speed_match = re.search(r"speed=\s*(?P<speed>\d+(\.\d+)?)x", line)
-        if speed_match:
-            datas["current_speed"] = float(speed_match.group("speed"))
+        # 绝大部分输出行（横幅、流信息、日志）既不是状态行也没有时长，直接跳过
+        if "=" in line:
+            for key, value in _STATUS_TOKEN_PATTERN.findall(line):
+                parser = _STATUS_FIELD_PARSERS.get(key)
+                if parser is None or parser[0] in datas:
+                    continue
+                try:
+                    datas[parser[0]] = parser[1](value)
+                except ValueError:
+                    continue
+        elif "Duration:" in line:
+            duration_match = _DURATION_PATTERN.search(line)
+            if duration_match:
+                datas["total_time"] = CxTime.from_timestamp(
+                    duration_match.group("duration")
+                )
 
         return datas
 
@@ -0,0 +1,93 @@
+import sys
+from typing import Any
+
+from cx_studio.core import CxTime, FileSize
+
+__all__ = [
+    "is_progress_pipe_supported",
+    "make_progress_arguments",
+    "FFmpegProgressParser",
+]
+
+
+def is_progress_pipe_supported() -> bool:
+    """-progress pipe:N 需要把额外的文件描述符传给子进程，Windows 上无法做到"""
+    return sys.platform != "win32"
+
+
+def make_progress_arguments(fd: int, interval: float | None = None) -> list[str]:
+    """生成以结构化格式向文件描述符 fd 输出进度的全局参数"""
+    result = ["-progress", f"pipe:{fd}", "-nostats"]
+    if interval is not None:
+        result += ["-stats_period", f"{interval:g}"]
+    return result
+
+
+class FFmpegProgressParser:
+    """解析 -progress 输出的 key=value 块
+
+    每个块以 progress=continue 或 progress=end 结束，
+    逐行喂入后在块结束时返回可用于 FFmpegCodingInfo.update 的字典。
+    """
+
+    def __init__(self) -> None:
+        self._block: dict[str, str] = {}
+        self.ended = False
+
+    @staticmethod
+    def _parse_microseconds(value: str) -> CxTime:
+        return CxTime(max(0, int(value)) // 1000)
+
+    @staticmethod
+    def _parse_size(value: str) -> FileSize:
+        return FileSize.from_bytes(int(value))
+
+    @staticmethod
+    def _parse_bitrate(value: str) -> FileSize:
+        if not value.endswith("/s"):
+            raise ValueError(f"Invalid bitrate: {value}")
+        return FileSize.from_string(value[:-2])
+
+    @staticmethod
+    def _parse_speed(value: str) -> float:
+        return float(value.rstrip("x"))
+
+    @classmethod
+    def parse_block(cls, block: dict[str, str]) -> dict[str, Any]:
+        datas: dict[str, Any] = {
+            "raw_input": " ".join(f"{k}={v}" for k, v in block.items())
+        }
+
+        # out_time_ms 在 ffmpeg 中实际也是微秒，只在没有 out_time_us 时使用
+        out_time = block.get("out_time_us", block.get("out_time_ms"))
+        q = next((v for k, v in block.items() if k.endswith("_q")), None)
+        fields = (
+            ("current_frame", block.get("frame"), int),
+            ("current_fps", block.get("fps"), float),
+            ("current_q", q, float),
+            ("current_size", block.get("total_size"), cls._parse_size),
+            ("current_time", out_time, cls._parse_microseconds),
+            ("current_bitrate", block.get("bitrate"), cls._parse_bitrate),
+            ("current_speed", block.get("speed"), cls._parse_speed),
+        )
+        for key, value, parser in fields:
+            if value is None:
+                continue
+            try:
+                datas[key] = parser(value)
+            except ValueError:
+                # 编码刚开始时很多字段为 N/A
+                continue
+        return datas
+
+    def feed_line(self, line: str) -> dict[str, Any] | None:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        if key != "progress":
+            self._block[key] = value
+            return None
+
+        self.ended = value == "end"
+        block, self._block = self._block, {}
+        return self.parse_block(block)
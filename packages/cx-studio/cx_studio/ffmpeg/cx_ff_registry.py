@@ -0,0 +1,120 @@
+import asyncio
+import re
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cx_studio.filesystem import CmdFinder
+
+__all__ = ["FFmpegCapabilities", "FFmpegRegistry"]
+
+
+@dataclass(frozen=True)
+class FFmpegCapabilities:
+    executable: str
+    version: str | None = None
+    encoders: frozenset[str] = field(default_factory=frozenset)
+    hwaccels: frozenset[str] = field(default_factory=frozenset)
+
+    @property
+    def available(self) -> bool:
+        return self.version is not None
+
+
+class FFmpegRegistry:
+    """进程内共享的 ffmpeg / ffprobe 登记表
+
+    每个可执行文件只查找一次路径、只探测一次版本与编码器等能力，
+    之后所有的 FFmpeg、FFmpegAsync 实例都直接使用缓存的结果。
+    """
+
+    # 只保护登记表本身，探测能力时持有的是各可执行文件自己的锁
+    _lock = threading.Lock()
+    _executables: dict[str, Path | None] = {}
+    _capabilities: dict[str, FFmpegCapabilities] = {}
+    _probe_locks: dict[str, threading.Lock] = {}
+
+    _ENCODER_PATTERN = re.compile(r"^\s*[VASD][\w.]{5}\s+(\S+)", re.MULTILINE)
+
+    @classmethod
+    def resolve(cls, cmd: str | Path) -> Path | None:
+        key = str(cmd)
+        try:
+            return cls._executables[key]
+        except KeyError:
+            pass
+        result = CmdFinder.which(cmd)
+        with cls._lock:
+            cls._executables[key] = result
+        return result
+
+    @staticmethod
+    def _run(executable: str, *args: str) -> str | None:
+        try:
+            process = subprocess.run(
+                [executable, "-hide_banner", *args],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                timeout=30,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if process.returncode != 0:
+            return None
+        return process.stdout.decode("utf-8", errors="ignore")
+
+    @classmethod
+    def _probe(cls, executable: str) -> FFmpegCapabilities:
+        version_output = cls._run(executable, "-version")
+        if not version_output:
+            return FFmpegCapabilities(executable)
+
+        version = None
+        version_match = re.search(r"version\s+(\S+)", version_output)
+        if version_match:
+            version = version_match.group(1)
+
+        # ffprobe 不支持 -encoders / -hwaccels，此时这两项为空
+        encoders_output = cls._run(executable, "-encoders") or ""
+        encoders_output = encoders_output.partition("------")[2]
+        hwaccels_output = cls._run(executable, "-hwaccels") or ""
+        hwaccels_output = hwaccels_output.partition(":")[2]
+
+        return FFmpegCapabilities(
+            executable=executable,
+            version=version or "unknown",
+            encoders=frozenset(cls._ENCODER_PATTERN.findall(encoders_output)),
+            hwaccels=frozenset(hwaccels_output.split()),
+        )
+
+    @classmethod
+    def get_capabilities(cls, cmd: str | Path) -> FFmpegCapabilities:
+        executable = str(cls.resolve(cmd) or cmd)
+        try:
+            return cls._capabilities[executable]
+        except KeyError:
+            pass
+        with cls._lock:
+            probe_lock = cls._probe_locks.setdefault(executable, threading.Lock())
+        # 同一可执行文件只探测一次，探测期间不阻塞其他可执行文件的查找与探测
+        with probe_lock:
+            if executable not in cls._capabilities:
+                capabilities = cls._probe(executable)
+                with cls._lock:
+                    cls._capabilities[executable] = capabilities
+            return cls._capabilities[executable]
+
+    @classmethod
+    async def get_capabilities_async(cls, cmd: str | Path) -> FFmpegCapabilities:
+        executable = str(cls.resolve(cmd) or cmd)
+        if executable in cls._capabilities:
+            return cls._capabilities[executable]
+        return await asyncio.to_thread(cls.get_capabilities, executable)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._executables.clear()
+            cls._capabilities.clear()
+            cls._probe_locks.clear()
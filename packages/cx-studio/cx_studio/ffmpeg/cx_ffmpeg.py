@@ -1,35 +1,58 @@
-import concurrent.futures as con_futures
 import io
+import os
+import queue
+import re
+import selectors
 import signal
 import subprocess
 import sys
 import threading
-import re
-
-from collections.abc import Iterable
+import time
+from collections.abc import Callable, Generator, Iterable
 from copy import copy
 from pathlib import Path
-from typing import IO
+from typing import IO, Any
 
 from pyee import EventEmitter
 
 from cx_studio.core import CxTime, FileSize
-from cx_studio.filesystem import CmdFinder
-from cx_studio.iotools import StreamUtils
+from cx_studio.iotools import LineRingBuffer, LineSplitter, StreamUtils
 from .cx_ff_errors import *
 from .cx_ff_infos import FFmpegCodingInfo
+from .cx_ff_registry import FFmpegRegistry
+from .cx_ff_progress import (
+    FFmpegProgressParser,
+    is_progress_pipe_supported,
+    make_progress_arguments,
+)
 
 
 class FFmpeg(EventEmitter):
-    def __init__(self, ffmpeg_executable: str | Path | None = None):
+    def __init__(
+        self,
+        ffmpeg_executable: str | Path | None = None,
+        progress_mode: bool = False,
+        progress_interval: float | None = None,
+        stderr_tail_lines: int = 100,
+    ):
         super().__init__()
-        self._executable: str = str(CmdFinder.which(ffmpeg_executable or "ffmpeg"))
+        self._executable: str = str(
+            FFmpegRegistry.resolve(ffmpeg_executable or "ffmpeg")
+        )
         self._coding_info = FFmpegCodingInfo()
 
+        # 进度模式下通过 -progress pipe:N 读取结构化的进度信息，
+        # stderr 只保留最后若干行，不再逐行解析状态
+        self._progress_mode = progress_mode and is_progress_pipe_supported()
+        self._progress_interval = progress_interval
+        self._stderr_tail = LineRingBuffer(max_lines=stderr_tail_lines)
+
         self._running_lock = threading.Lock()
         self._running_cond = threading.Condition(self._running_lock)
         self._cancel_event = threading.Event()
         self._canceled = False
+        self._wakeup_fd: int | None = None
+        self._output_handler: Callable[[bytes], Any] | None = None
         self._process: subprocess.Popen[bytes]
 
     @property
@@ -40,11 +63,26 @@ class FFmpeg(EventEmitter):
     def coding_info(self) -> FFmpegCodingInfo:
         return copy(self._coding_info)
 
+    @property
+    def progress_mode(self) -> bool:
+        return self._progress_mode
+
+    @property
+    def stderr_tail(self) -> list[str]:
+        return self._stderr_tail.lines()
+
     def is_running(self) -> bool:
         return self._running_lock.locked()
 
     def cancel(self):
         self._cancel_event.set()
+        # 唤醒正在等待管道的 selector
+        wakeup_fd = self._wakeup_fd
+        if wakeup_fd is not None:
+            try:
+                os.write(wakeup_fd, b"\0")
+            except OSError:
+                pass
 
     def terminate(self):
         sigterm = signal.SIGTERM if sys.platform != "win32" else signal.CTRL_BREAK_EVENT
@@ -90,7 +128,7 @@ class FFmpeg(EventEmitter):
                 result["bitrate"] = FileSize.from_string(time_match.group(3))
                 continue
 
-            streams_match = re.search(r"Stream #0:\d+\s+", line_str)
+            streams_match = re.search(r"Stream #0:\d+", line_str)
             if streams_match:
                 streams.append(line_str.strip())
                 continue
@@ -109,41 +147,52 @@ class FFmpeg(EventEmitter):
         self._process.stdin.flush()
         self._process.stdin.close()
 
-    def _read_stdout(self) -> bytes:
+    def _handle_stdout_chunk(self, chunk: bytes) -> None:
+        if chunk and self._output_handler is not None:
+            self._output_handler(chunk)
+
+    def _read_stdout(self) -> None:
         assert self._process.stdout is not None
+        for chunk in StreamUtils.read_stream(self._process.stdout, 65536):
+            self._handle_stdout_chunk(chunk)
+        self._process.stdout.close()
 
-        buffer = bytearray()
-        for chunk in StreamUtils.read_stream(
-            self._process.stdout, io.DEFAULT_BUFFER_SIZE
-        ):
-            buffer.extend(chunk)
+    def _apply_coding_info(self, coding_info_dict: dict[str, Any]) -> None:
+        self._coding_info.update(**coding_info_dict)
 
-        self._process.stdout.close()
-        return bytes(buffer)
+        if "current_time" in coding_info_dict or "total_time" in coding_info_dict:
+            self.emit(
+                "progress_updated",
+                self._coding_info.current_time,
+                self._coding_info.total_time,
+            )
 
-    def _handle_stderr(self) -> str:
-        assert self._process.stderr is not None
-        line = b""
-        for line in StreamUtils.readlines_from_stream(self._process.stderr):
-            line_str = line.decode("utf-8", errors="ignore")
-            self.emit("verbose", line_str)
+        if "current_frame" in coding_info_dict:
+            self.emit("status_updated", copy(self._coding_info))
 
-            coding_info_dict = FFmpegCodingInfo.parse_status_line(line_str)
+    def _handle_stderr_line(self, line: bytes) -> None:
+        line_str = line.decode("utf-8", errors="ignore")
+        self._stderr_tail.append(line_str)
+        self.emit("verbose", line_str)
 
-            self._coding_info.update(**coding_info_dict)
+        if self._progress_mode:
+            # 总时长仍然只能从 stderr 中获得
+            if self._coding_info.total_time is None and "Duration:" in line_str:
+                self._apply_coding_info(FFmpegCodingInfo.parse_status_line(line_str))
+            return
 
-            if "current_time" in coding_info_dict or "total_time" in coding_info_dict:
-                self.emit(
-                    "progress_updated",
-                    self._coding_info.current_time,
-                    self._coding_info.total_time,
-                )
+        self._apply_coding_info(FFmpegCodingInfo.parse_status_line(line_str))
 
-            if "current_frame" in coding_info_dict:
-                self.emit("status_updated", copy(self._coding_info))
+    def _handle_progress_line(self, parser: FFmpegProgressParser, line: bytes) -> None:
+        coding_info_dict = parser.feed_line(line.decode("utf-8", errors="ignore"))
+        if coding_info_dict is not None:
+            self._apply_coding_info(coding_info_dict)
 
+    def _handle_stderr(self) -> None:
+        assert self._process.stderr is not None
+        for line in StreamUtils.readlines_from_stream(self._process.stderr):
+            self._handle_stderr_line(line)
         self._process.stderr.close()
-        return line.decode()
 
     def _handle_cancel_event(self) -> None:
         while self._process.poll() is None:
@@ -151,58 +200,181 @@ class FFmpeg(EventEmitter):
                 self._canceled = True
                 self._process.terminate()
                 self._process.wait()
-                self._cancel_event.clear()
                 break
 
+    def _pump_with_threads(self, input_stream: IO[bytes] | None) -> None:
+        """无法对管道使用 selector 的平台（Windows）上，用少量辅助线程处理管道"""
+        threads = [
+            threading.Thread(target=self._redirect_stdin, args=(input_stream,)),
+            threading.Thread(target=self._read_stdout),
+            threading.Thread(target=self._handle_cancel_event),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            self._handle_stderr()
+        finally:
+            self._process.wait()
+            for thread in threads:
+                thread.join()
+
+    def _pump(self, input_stream: IO[bytes] | None, progress_fd: int | None) -> None:
+        """在当前线程中用 selector 同时处理子进程的所有管道以及取消请求"""
+        process = self._process
+        assert process.stdout is not None and process.stderr is not None
+
+        stderr_splitter = LineSplitter()
+        progress_splitter = LineSplitter()
+        progress_parser = FFmpegProgressParser()
+        pending_input = b""
+        kill_deadline: float | None = None
+
+        def on_stderr(chunk: bytes) -> None:
+            for line in (
+                stderr_splitter.feed(chunk) if chunk else stderr_splitter.flush()
+            ):
+                self._handle_stderr_line(line)
+
+        def on_progress(chunk: bytes) -> None:
+            lines = (
+                progress_splitter.feed(chunk) if chunk else progress_splitter.flush()
+            )
+            for line in lines:
+                self._handle_progress_line(progress_parser, line)
+
+        readers: dict[int, Callable[[bytes], None]] = {
+            process.stderr.fileno(): on_stderr,
+            process.stdout.fileno(): self._handle_stdout_chunk,
+        }
+        if progress_fd is not None:
+            readers[progress_fd] = on_progress
+
+        wakeup_r, wakeup_w = os.pipe()
+        os.set_blocking(wakeup_w, False)
+        self._wakeup_fd = wakeup_w
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(wakeup_r, selectors.EVENT_READ)
+            for fd in readers:
+                selector.register(fd, selectors.EVENT_READ)
+            stdin_fd = None
+            if input_stream is not None and process.stdin is not None:
+                stdin_fd = process.stdin.fileno()
+                os.set_blocking(stdin_fd, False)
+                selector.register(stdin_fd, selectors.EVENT_WRITE)
+
+            while readers:
+                if self._cancel_event.is_set() and kill_deadline is None:
+                    self._canceled = True
+                    process.terminate()
+                    kill_deadline = time.monotonic() + 4
+                timeout = None
+                if kill_deadline is not None:
+                    timeout = kill_deadline - time.monotonic()
+                    if timeout <= 0 and process.poll() is None:
+                        process.kill()
+                        kill_deadline = time.monotonic() + 3600
+                        continue
+
+                for key, _events in selector.select(timeout):
+                    fd = key.fd
+                    if fd == wakeup_r:
+                        os.read(wakeup_r, 1024)
+                    elif fd == stdin_fd:
+                        try:
+                            if not pending_input:
+                                pending_input = input_stream.read(  # type: ignore[union-attr]
+                                    io.DEFAULT_BUFFER_SIZE
+                                )
+                            if pending_input:
+                                written = os.write(fd, pending_input)
+                                pending_input = pending_input[written:]
+                                continue
+                        except BlockingIOError:
+                            continue
+                        except BrokenPipeError:
+                            pass
+                        selector.unregister(fd)
+                        process.stdin.close()  # type: ignore[union-attr]
+                        stdin_fd = None
+                    else:
+                        chunk = os.read(fd, 65536)
+                        readers[fd](chunk)
+                        if not chunk:
+                            selector.unregister(fd)
+                            del readers[fd]
+        finally:
+            self._wakeup_fd = None
+            selector.close()
+            os.close(wakeup_r)
+            os.close(wakeup_w)
+            if progress_fd is not None:
+                os.close(progress_fd)
+            if process.stdin is not None:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+            process.stdout.close()
+            process.stderr.close()
+
     def execute(
         self,
         arguments: Iterable[str] | None = None,
         input_stream: IO[bytes] | None = None,
+        output_handler: Callable[[bytes], Any] | None = None,
     ) -> bool:
+        """执行 ffmpeg，标准输出的数据块会依次交给 output_handler，不会在内存中累积"""
         with self._running_cond:
+            self._output_handler = output_handler
             self._canceled = False
             self._cancel_event.clear()
+            self._coding_info = FFmpegCodingInfo()
+            self._stderr_tail.clear()
 
             try:
                 args = [self._executable, *(arguments or [])]
 
-                self._process = StreamUtils.create_subprocess(
-                    args,
-                    bufsize=0,
-                    stdin=subprocess.PIPE if input_stream is not None else None,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
+                progress_fds = os.pipe() if self._progress_mode else None
+                if progress_fds:
+                    args[1:1] = make_progress_arguments(
+                        progress_fds[1], self._progress_interval
+                    )
+                try:
+                    self._process = StreamUtils.create_subprocess(
+                        args,
+                        bufsize=0,
+                        stdin=subprocess.PIPE if input_stream is not None else None,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        pass_fds=progress_fds[1:] if progress_fds else (),
+                    )
+                except BaseException:
+                    if progress_fds:
+                        os.close(progress_fds[0])
+                    raise
+                finally:
+                    # 写入端只属于子进程，父进程必须关闭才能在结束时读到 EOF
+                    if progress_fds:
+                        os.close(progress_fds[1])
 
                 self.emit("started")
 
                 if input_stream is not None:
                     input_stream = StreamUtils.wrap_io(input_stream)
 
-                with con_futures.ThreadPoolExecutor() as executor:
-                    futures = [
-                        executor.submit(self._handle_stderr),
-                        executor.submit(self._redirect_stdin, input_stream),
-                        executor.submit(self._read_stdout),
-                        executor.submit(self._handle_cancel_event),
-                        executor.submit(self._process.wait),
-                    ]
-
-                    done, pending = con_futures.wait(
-                        futures,
-                        timeout=None,
-                        return_when=con_futures.FIRST_EXCEPTION,
-                    )
-
-                    for future in done:
-                        exc = future.exception()
-                        if exc is not None:
-                            self._process.terminate()
-                            con_futures.wait(pending)
-                            raise exc
+                if sys.platform == "win32":
+                    self._pump_with_threads(input_stream)
+                else:
+                    self._pump(input_stream, progress_fds[0] if progress_fds else None)
             except Exception as exc:
                 self.emit("verbose", f"Unexpected error during execution: {exc}")
+                if self._process.poll() is None:
+                    self._process.terminate()
             self._process.wait()
+            self._cancel_event.clear()
+            self._output_handler = None
             result = self._process.returncode == 0
             if self._canceled:
                 self.emit("canceled")
@@ -213,3 +385,42 @@ class FFmpeg(EventEmitter):
             return result
 
         # running_cond
+
+    def iter_output(
+        self,
+        arguments: Iterable[str] | None = None,
+        input_stream: IO[bytes] | None = None,
+        max_pending_chunks: int = 16,
+    ) -> Generator[bytes]:
+        """在后台执行 ffmpeg 并逐块返回标准输出
+
+        未被取走的数据块最多缓存 max_pending_chunks 个，之后 ffmpeg 将等待读取。
+        提前结束迭代会取消 ffmpeg；运行失败时抛出 FFmpegError。
+        """
+        args = list(arguments or [])
+        chunks: queue.Queue[bytes | None] = queue.Queue(max(1, max_pending_chunks))
+        results: list[bool] = []
+
+        def run() -> None:
+            try:
+                results.append(self.execute(args, input_stream, chunks.put))
+            finally:
+                chunks.put(None)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            while (chunk := chunks.get()) is not None:
+                yield chunk
+        finally:
+            if thread.is_alive():
+                self.cancel()
+                # 继续取走数据，避免后台线程阻塞在已满的队列上
+                while chunks.get() is not None:
+                    pass
+            thread.join()
+
+        if not results or (not results[0] and not self._canceled):
+            raise FFmpegError.create(
+                "\n".join(self._stderr_tail.lines()[-5:]) or "ffmpeg failed", args
+            )
@@ -1,29 +1,48 @@
 import asyncio
+import os
 import re
 import signal
 import sys
-from collections.abc import Iterable
+import inspect
+from collections.abc import AsyncGenerator, Callable, Iterable
 from copy import copy
 from pathlib import Path
 
 from pyee.asyncio import AsyncIOEventEmitter
 
 from cx_studio.core import CxTime, FileSize
-from cx_studio.filesystem.path_expander import CmdFinder
-from cx_studio.iotools import AsyncStreamUtils
+from cx_studio.iotools import AsyncStreamUtils, LineRingBuffer
 from typing import Any
+from .cx_ff_errors import FFmpegError
 from .cx_ff_infos import FFmpegCodingInfo
+from .cx_ff_registry import FFmpegRegistry
+from .cx_ff_progress import (
+    FFmpegProgressParser,
+    is_progress_pipe_supported,
+    make_progress_arguments,
+)
 
 
 class FFmpegAsync(AsyncIOEventEmitter):
     def __init__(
         self,
         ffmpeg_executable: str | Path | None = None,
+        progress_mode: bool = False,
+        progress_interval: float | None = None,
+        stderr_tail_lines: int = 100,
     ):
         super().__init__()
-        self._executable: str = str(CmdFinder.which(ffmpeg_executable or "ffmpeg"))
+        self._executable: str = str(
+            FFmpegRegistry.resolve(ffmpeg_executable or "ffmpeg")
+        )
         self._coding_info = FFmpegCodingInfo()
 
+        # 进度模式下通过 -progress pipe:N 读取结构化的进度信息，
+        # stderr 只保留最后若干行，不再逐行解析状态
+        self._progress_mode = progress_mode and is_progress_pipe_supported()
+        self._progress_interval = progress_interval
+        self._stderr_tail = LineRingBuffer(max_lines=stderr_tail_lines)
+
         self._is_running = asyncio.Condition()
         self._cancel_event = asyncio.Event()
         self._canceled = False
@@ -41,33 +60,81 @@ class FFmpegAsync(AsyncIOEventEmitter):
     def coding_info(self) -> FFmpegCodingInfo:
         return copy(self._coding_info)
 
+    @property
+    def progress_mode(self) -> bool:
+        return self._progress_mode
+
+    @property
+    def stderr_tail(self) -> list[str]:
+        return self._stderr_tail.lines()
+
+    def _apply_coding_info(self, coding_info_dict: dict[str, Any]) -> None:
+        self._coding_info.update(**coding_info_dict)
+
+        if "current_time" in coding_info_dict or "total_time" in coding_info_dict:
+            self.emit(
+                "progress_updated",
+                self._coding_info.current_time,
+                self._coding_info.total_time,
+            )
+
+        if "current_frame" in coding_info_dict:
+            self.emit("status_updated", copy(self._coding_info))
+
     async def _handle_stderr(self):
         stream = AsyncStreamUtils.wrap_io(self._process.stderr)
         async for line in AsyncStreamUtils.readlines_from_stream(stream):
             line_str = line.decode("utf-8", errors="ignore")
+            self._stderr_tail.append(line_str)
             self.emit("verbose", line_str)
 
-            coding_info_dict = FFmpegCodingInfo.parse_status_line(line_str)
+            if self._progress_mode:
+                # 总时长仍然只能从 stderr 中获得
+                if self._coding_info.total_time is None and "Duration:" in line_str:
+                    self._apply_coding_info(
+                        FFmpegCodingInfo.parse_status_line(line_str)
+                    )
+                continue
 
-            self._coding_info.update(**coding_info_dict)
+            self._apply_coding_info(FFmpegCodingInfo.parse_status_line(line_str))
 
-            if "current_time" in coding_info_dict or "total_time" in coding_info_dict:
-                self.emit(
-                    "progress_updated",
-                    self._coding_info.current_time,
-                    self._coding_info.total_time,
-                )
+    async def _handle_stdout(self, output_handler: Callable[[bytes], Any]):
+        assert self._process.stdout is not None
+        async for chunk in AsyncStreamUtils.read_stream(self._process.stdout, 65536):
+            result = output_handler(chunk)
+            if inspect.isawaitable(result):
+                await result
 
-            if "current_frame" in coding_info_dict:
-                self.emit("status_updated", copy(self._coding_info))
+    async def _handle_progress(self, fd: int):
+        loop = asyncio.get_running_loop()
+        stream = asyncio.StreamReader()
+        transport, _protocol = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stream), os.fdopen(fd, "rb", 0)
+        )
+        try:
+            parser = FFmpegProgressParser()
+            async for line in AsyncStreamUtils.readlines_from_stream(stream):
+                coding_info_dict = parser.feed_line(
+                    line.decode("utf-8", errors="ignore")
+                )
+                if coding_info_dict is not None:
+                    self._apply_coding_info(coding_info_dict)
+        finally:
+            transport.close()
 
     def is_running(self) -> bool:
         return self._is_running.locked()
 
+    async def wait_for_complete(self) -> None:
+        async with self._is_running:
+            pass
+
     def cancel(self):
         self._cancel_event.set()
 
     async def terminate(self):
+        if self._process.returncode is not None:
+            return
         sigterm = signal.SIGTERM if sys.platform != "win32" else signal.CTRL_BREAK_EVENT
         self._process.send_signal(sigterm)
         try:
@@ -88,52 +155,78 @@ class FFmpegAsync(AsyncIOEventEmitter):
         self,
         arguments: Iterable[str] | None = None,
         input_stream: asyncio.StreamReader | bytes | None = None,
+        output_handler: Callable[[bytes], Any] | None = None,
     ) -> bool:
+        """执行 ffmpeg
+
+        指定 output_handler 时标准输出会被逐块交给它处理（可以是协程函数），
+        否则标准输出保持继承自父进程。
+        """
         args = list(arguments or [])
         self._cancel_event.clear()
         self._canceled = False
+        self._coding_info = FFmpegCodingInfo()
+        self._stderr_tail.clear()
         async with self._is_running:
-            self._process = await AsyncStreamUtils.create_subprocess(
-                self._executable,
-                *args,
-                stdin=asyncio.subprocess.PIPE if input_stream else None,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            progress_fds = os.pipe() if self._progress_mode else None
+            if progress_fds:
+                args = [
+                    *make_progress_arguments(progress_fds[1], self._progress_interval),
+                    *args,
+                ]
+            try:
+                self._process = await AsyncStreamUtils.create_subprocess(
+                    self._executable,
+                    *args,
+                    stdin=asyncio.subprocess.PIPE if input_stream else None,
+                    stdout=asyncio.subprocess.PIPE if output_handler else None,
+                    stderr=asyncio.subprocess.PIPE,
+                    pass_fds=progress_fds[1:] if progress_fds else (),
+                )
+            except BaseException:
+                if progress_fds:
+                    os.close(progress_fds[0])
+                raise
+            finally:
+                # 写入端只属于子进程，父进程必须关闭才能在结束时读到 EOF
+                if progress_fds:
+                    os.close(progress_fds[1])
 
             self.emit("started")
 
             i_stream = AsyncStreamUtils.wrap_io(input_stream)
+            cancel_task = asyncio.create_task(self._cancel_event.wait())
 
             try:
-                main_task = asyncio.create_task(self._handle_stderr())
-                tasks = [main_task]
+                readers = [self._handle_stderr()]
+                if progress_fds:
+                    readers.append(self._handle_progress(progress_fds[0]))
+                if output_handler:
+                    readers.append(self._handle_stdout(output_handler))
+                main_task = asyncio.ensure_future(asyncio.gather(*readers))
+                tasks: list[asyncio.Future[Any]] = [main_task]
                 if input_stream and self._process.stdin:
                     redirect_task = asyncio.create_task(
                         AsyncStreamUtils.redirect_stream(i_stream, self._process.stdin)
                     )
                     tasks.append(redirect_task)
 
-                while not main_task.done():
-                    if self._cancel_event.is_set():
-                        self._canceled = True
-                        sigterm = (
-                            signal.SIGTERM
-                            if sys.platform != "win32"
-                            else signal.CTRL_BREAK_EVENT
-                        )
-                        self._process.send_signal(sigterm)
-                        try:
-                            await asyncio.wait_for(self._process.wait(), 4)
-                        except asyncio.TimeoutError:
-                            self._process.terminate()
-                        self._cancel_event.clear()
-                    await asyncio.sleep(0.1)
+                # 等待 stderr 读取结束或取消信号，二者先到者生效
+                await asyncio.wait(
+                    [main_task, cancel_task], return_when=asyncio.FIRST_COMPLETED
+                )
+                if cancel_task.done() and not main_task.done():
+                    self._canceled = True
+                    await self.terminate()
+                    self._cancel_event.clear()
                 await asyncio.wait(tasks)
 
             except asyncio.CancelledError:
-                self.cancel()
+                self._canceled = True
+                await self.terminate()
 
             finally:
+                cancel_task.cancel()
                 await self._process.wait()
                 result = self._process.returncode == 0
                 if self._canceled:
@@ -145,6 +238,43 @@ class FFmpegAsync(AsyncIOEventEmitter):
             return result
         # running condition
 
+    async def iter_output(
+        self,
+        arguments: Iterable[str] | None = None,
+        input_stream: asyncio.StreamReader | bytes | None = None,
+        max_pending_chunks: int = 16,
+    ) -> AsyncGenerator[bytes]:
+        """执行 ffmpeg 并逐块返回标准输出
+
+        未被取走的数据块最多缓存 max_pending_chunks 个，之后 ffmpeg 将等待读取。
+        提前结束迭代会取消 ffmpeg；运行失败时抛出 FFmpegError。
+        """
+        args = list(arguments or [])
+        chunks: asyncio.Queue[bytes | None] = asyncio.Queue(max(1, max_pending_chunks))
+
+        async def run() -> bool:
+            try:
+                return await self.execute(args, input_stream, chunks.put)
+            finally:
+                await chunks.put(None)
+
+        task = asyncio.create_task(run())
+        try:
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+        finally:
+            if not task.done():
+                self.cancel()
+                # 继续取走数据，避免 ffmpeg 阻塞在已满的队列上
+                while await chunks.get() is not None:
+                    pass
+            result = await task
+
+        if not result and not self._canceled:
+            raise FFmpegError.create(
+                "\n".join(self._stderr_tail.lines()[-5:]) or "ffmpeg failed", args
+            )
+
     async def _parse_basic_info_from_stream(
         self, input_stream: asyncio.StreamReader
     ) -> dict[str, Any]:
@@ -168,7 +298,7 @@ class FFmpegAsync(AsyncIOEventEmitter):
                 result["bitrate"] = FileSize.from_string(time_match.group(3))
                 continue
 
-            streams_match = re.search(r"Stream #0:\d+\s+", line_str)
+            streams_match = re.search(r"Stream #0:\d+", line_str)
             if streams_match:
                 streams.append(line_str.strip())
                 continue
@@ -10,3 +10,7 @@ from .path_expander import *
 from .encoding_detector import *
 
 from .cx_pathutils import *
+
+from .cx_file_info_cache import *
+
+from .cx_path_stat_cache import *
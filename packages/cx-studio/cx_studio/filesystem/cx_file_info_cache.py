@@ -1,245 +1,625 @@
 # file_cache.py
-# 遵循规则：初始化无批量操作 | 运行时仅单条校验 | 仅析构执行淘汰 | 线程安全 | 语义化API
+# 遵循规则：初始化无批量操作 | 单次 stat 校验 | 可选内存层 | 读取不提交事务 | 批量接口单事务 | 增量淘汰 | 线程安全 | 多进程共享 | 语义化API
 import os
+import sys
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable, Mapping
 from pathlib import Path
+from typing import Literal
 import time
 import json
 import sqlite3
 import threading
+import weakref
+from contextlib import contextmanager
+
+# 文件签名：(st_mtime_ns, st_size, st_ino, st_dev)
+Signature = tuple[int, int, int, int]
+# 一条缓存记录：(签名, 用户数据)
+Entry = tuple[Signature, dict]
 
 
 class FileInfoCache:
-    def __init__(self, db_path: Path, max_size: int = -1):
-        """初始化：仅连接数据库 + 创建表，无任何清理/淘汰"""
+    # 单条 SQL 中 IN (...) 的最大参数个数
+    _CHUNK_SIZE = 500
+    # Windows 上同一目录下待校验的文件达到此数量时改为扫描整个目录
+    _SCANDIR_THRESHOLD = 16
+    _SCHEMA_VERSION = 3
+    # 记录数与数据总量由触发器维护在 file_cache_meta 中，淘汰时无需 COUNT(*)
+    _SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS file_cache (
+            file_abs_path TEXT PRIMARY KEY,
+            file_mtime_ns INTEGER NOT NULL,
+            file_size INTEGER NOT NULL,
+            file_ino INTEGER NOT NULL,
+            file_dev INTEGER NOT NULL,
+            cache_last_access REAL NOT NULL,
+            user_data JSON NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS file_cache_last_access
+        ON file_cache (cache_last_access)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS file_cache_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            row_count INTEGER NOT NULL,
+            total_bytes INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO file_cache_meta VALUES (0, 0, 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS file_cache_insert AFTER INSERT ON file_cache
+        BEGIN
+            UPDATE file_cache_meta SET row_count = row_count + 1,
+                total_bytes = total_bytes + length(new.user_data);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS file_cache_delete AFTER DELETE ON file_cache
+        BEGIN
+            UPDATE file_cache_meta SET row_count = row_count - 1,
+                total_bytes = total_bytes - length(old.user_data);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS file_cache_update
+        AFTER UPDATE OF user_data ON file_cache
+        BEGIN
+            UPDATE file_cache_meta SET
+                total_bytes = total_bytes + length(new.user_data) - length(old.user_data);
+        END
+        """,
+    ]
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_size: int = -1,
+        flush_threshold: int = 256,
+        memory_size: int = 0,
+        write_mode: Literal["through", "back"] = "through",
+        max_bytes: int = -1,
+        maintenance_writes: int = 1000,
+        maintenance_batch: int = 500,
+        maintenance_interval: float = 0,
+        busy_timeout: float = 30.0,
+    ):
+        """初始化：仅连接数据库 + 创建表，无任何清理/淘汰
+
+        读取时产生的访问时间更新与失效记录删除会先暂存在内存中，
+        累计 flush_threshold 条或下一次写入时再合并到同一个事务中提交。
+
+        memory_size 大于 0 时在数据库前增加一层最多保存 memory_size 条记录的 LRU 内存缓存，
+        命中时只需一次 stat 校验。write_mode 为 back 时写入先保存在内存中，
+        累计 flush_threshold 条或调用 flush/close 时才写入数据库，进程崩溃会丢失这部分记录。
+
+        记录数超过 max_size 或数据总量超过 max_bytes 时，在写入的同一事务中按最近访问时间淘汰，
+        每条语句至多删除 maintenance_batch 条，直到不再超出限制。
+        失效记录的清理是增量进行的：每写入 maintenance_writes 条记录，
+        或每隔 maintenance_interval 秒（大于 0 时由后台线程执行），
+        调用一次 maintain 检查至多 maintenance_batch 条记录。
+
+        同一个数据库可以被多个进程同时使用。每个线程使用独立的连接，
+        写入以 BEGIN IMMEDIATE 开始的短事务进行，遇到其他进程持有写锁时最多等待 busy_timeout 秒。
+        内存层只在本进程内有效，其他进程写入的记录要等本进程的内存层淘汰后才能读到。
+        """
         self.max_size = max_size
+        self.flush_threshold = max(1, flush_threshold)
+        self.memory_size = max(0, memory_size)
+        self.write_mode = write_mode
+        self.max_bytes = max_bytes
+        self.maintenance_writes = max(1, maintenance_writes)
+        self.maintenance_batch = max(1, maintenance_batch)
+        self.busy_timeout = max(0.0, busy_timeout)
         self.db_path = db_path.resolve().absolute()
+        # 保护内存层与暂存操作，数据库读取不需要持有
         self.lock = threading.Lock()
 
-        # 数据库连接
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._maintenance_thread: threading.Thread | None = None
+        # 记录每次被写入或删除时递增，用于判断锁外读取的记录是否已过时
+        self._generation = 0
 
-        # 创建缓存表
-        with self.lock:
-            self._sql(
-                """
-                CREATE TABLE IF NOT EXISTS file_cache (
-                    file_abs_path TEXT PRIMARY KEY,
-                    file_mtime REAL NOT NULL,
-                    cache_last_access REAL NOT NULL,
-                    user_data JSON NOT NULL
-                )
-            """,
-                commit=True,
+        self._pending_access: dict[str, float] = {}
+        self._pending_deletes: set[str] = set()
+        self._pending_writes: dict[str, Entry] = {}
+        self._memory: OrderedDict[str, Entry] = OrderedDict()
+        self._writes_since_maintenance = 0
+        # 失效记录清理的进度，按 rowid 分批向后扫描
+        self._scan_rowid = 0
+        # close 用到的属性都已创建，此后初始化失败时析构也能正常关闭
+        self._closed = False
+
+        # WAL 模式写入数据库文件后对所有连接长期有效，读写互不阻塞
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # 创建缓存表，多个进程同时启动时由写锁保证只迁移一次
+        with self.lock, self._transaction():
+            self._migrate()
+            for statement in self._SCHEMA:
+                self.conn.execute(statement)
+            self.conn.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
+
+        if maintenance_interval > 0:
+            self._maintenance_thread = threading.Thread(
+                target=self._maintenance_loop,
+                # 只持有弱引用，缓存对象仍然可以被正常回收
+                args=(weakref.ref(self), self._stop_event, maintenance_interval),
+                name="FileInfoCacheMaintenance",
+                daemon=True,
             )
+            self._maintenance_thread.start()
 
     # ====================== 私有工具方法 ======================
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """当前线程的数据库连接，首次使用时创建"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed cache.")
+            # 自行管理事务；允许在 close 时由其他线程关闭
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            # NORMAL 同步级别只在检查点时 fsync
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """写事务，开始时即获取写锁，避免读事务升级为写事务时与其他进程冲突"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            # 部分错误会由 SQLite 自动回滚
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
     def _get_abs_path(self, file_path: str | Path) -> str:
         """标准化绝对路径"""
         return os.path.realpath(os.path.expanduser(str(file_path)))
 
-    def _sql(self, sql: str, params=(), commit: bool = False):
-        """统一SQL执行（线程安全）"""
-        self.cursor.execute(sql, params)
-        if commit:
-            self.conn.commit()
-        return self.cursor
-
-    def _validate(self, abs_path: str) -> bool:
-        """运行时：仅校验单条缓存有效性，无效则删除"""
-        if not os.path.exists(abs_path):
-            self._sql(
-                "DELETE FROM file_cache WHERE file_abs_path = ?",
-                (abs_path,),
-                commit=True,
-            )
-            return False
+    def _migrate(self):
+        """旧版本的记录无法换算为新的签名与统计信息，直接重建缓存表"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < self._SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS file_cache")
+            self.conn.execute("DROP TABLE IF EXISTS file_cache_meta")
 
-        current_mtime = os.path.getmtime(abs_path)
-        res = self._sql(
-            "SELECT file_mtime FROM file_cache WHERE file_abs_path = ?", (abs_path,)
-        ).fetchone()
-        if not res or res[0] != current_mtime:
-            self._sql(
-                "DELETE FROM file_cache WHERE file_abs_path = ?",
-                (abs_path,),
-                commit=True,
-            )
-            return False
-        return True
+    @staticmethod
+    def _make_signature(st: os.stat_result) -> Signature:
+        # Windows 上 os.scandir 得到的 stat 不含 inode 与设备号，统一不使用
+        if sys.platform == "win32":
+            return st.st_mtime_ns, st.st_size, 0, 0
+        # SQLite 的整数为有符号 64 位，部分文件系统的 inode 会超出范围
+        mask = 0x7FFFFFFFFFFFFFFF
+        return st.st_mtime_ns, st.st_size, st.st_ino & mask, st.st_dev & mask
+
+    @classmethod
+    def _get_signature(cls, abs_path: str) -> Signature | None:
+        try:
+            return cls._make_signature(os.stat(abs_path))
+        except OSError:
+            return None
+
+    @classmethod
+    def _get_signatures(cls, abs_paths: Iterable[str]) -> dict[str, Signature | None]:
+        """批量获取签名
 
-    def _batch_clean_invalid(self):
-        """【仅析构调用】批量清理无效缓存"""
-        if self.max_size <= 0:
+        Windows 上 DirEntry.stat 直接使用目录列表中的信息，
+        同一目录下的大量文件通过扫描目录一次性获取；
+        POSIX 上 DirEntry.stat 仍然要逐个 stat，扫描目录只会多出一次列目录的开销。
+        """
+        if sys.platform != "win32":
+            return {x: cls._get_signature(x) for x in abs_paths}
+        by_dir: dict[str, list[str]] = defaultdict(list)
+        for abs_path in abs_paths:
+            by_dir[os.path.dirname(abs_path)].append(abs_path)
+
+        result: dict[str, Signature | None] = {}
+        for folder, paths in by_dir.items():
+            if len(paths) < cls._SCANDIR_THRESHOLD:
+                for abs_path in paths:
+                    result[abs_path] = cls._get_signature(abs_path)
+                continue
+            wanted = set(paths)
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.path in wanted:
+                            try:
+                                result[entry.path] = cls._make_signature(entry.stat())
+                            except OSError:
+                                result[entry.path] = None
+            except OSError:
+                pass
+            # 目录中没有列出的文件视为不存在
+            for abs_path in paths:
+                result.setdefault(abs_path, None)
+        return result
+
+    def _iter_chunks(self, items: list) -> Iterable[list]:
+        for i in range(0, len(items), self._CHUNK_SIZE):
+            yield items[i : i + self._CHUNK_SIZE]
+
+    def _fetch_records(self, abs_paths: list[str]) -> dict[str, Entry]:
+        """从数据库批量读取记录"""
+        result = {}
+        for chunk in self._iter_chunks(abs_paths):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                "SELECT file_abs_path, file_mtime_ns, file_size, file_ino, file_dev, "
+                f"user_data FROM file_cache WHERE file_abs_path IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for path, mtime_ns, size, ino, dev, data in rows:
+                result[path] = ((mtime_ns, size, ino, dev), json.loads(data))
+        return result
+
+    def _remember(self, abs_path: str, entry: Entry):
+        if self.memory_size <= 0:
             return
-        rows = self._sql("SELECT file_abs_path, file_mtime FROM file_cache").fetchall()
-        invalid = [
-            (p,) for p, m in rows if not os.path.exists(p) or os.path.getmtime(p) != m
-        ]
-        if invalid:
-            self._sql(
-                "DELETE FROM file_cache WHERE file_abs_path = ?", invalid, commit=True
+        self._memory[abs_path] = entry
+        self._memory.move_to_end(abs_path)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _forget(self, abs_path: str):
+        self._generation += 1
+        self._memory.pop(abs_path, None)
+        self._pending_writes.pop(abs_path, None)
+        self._pending_access.pop(abs_path, None)
+
+    def _load_memory(self, abs_paths: list[str]) -> tuple[dict[str, Entry], list[str]]:
+        """从内存层和待写入记录中读取记录，返回命中的记录与未命中的路径"""
+        result = {}
+        misses = []
+        for abs_path in abs_paths:
+            entry = self._memory.get(abs_path) or self._pending_writes.get(abs_path)
+            if entry is None:
+                misses.append(abs_path)
+                continue
+            if abs_path in self._memory:
+                self._memory.move_to_end(abs_path)
+            result[abs_path] = entry
+        return result, misses
+
+    def _load(self, abs_paths: list[str]) -> dict[str, Entry]:
+        """依次从内存层、待写入记录和数据库中读取记录，不做校验"""
+        result, misses = self._load_memory(abs_paths)
+        if misses:
+            for abs_path, entry in self._fetch_records(misses).items():
+                self._remember(abs_path, entry)
+                result[abs_path] = entry
+        return result
+
+    def _read_valid(self, abs_paths: list[str]) -> dict[str, dict]:
+        """读取并校验记录，失效的记录只登记待删除，不立即提交
+
+        数据库查询与 stat 校验都在锁外进行，多个线程可以同时读取。
+        """
+        with self.lock:
+            entries, misses = self._load_memory(abs_paths)
+            generation = self._generation
+        fetched = self._fetch_records(misses) if misses else {}
+        entries.update(fetched)
+        signatures = self._get_signatures(entries)
+        now = time.time()
+        result = {}
+        with self.lock:
+            # 查询期间有其他线程改动过记录时，不用可能过时的结果覆盖内存层
+            stale = generation != self._generation
+            for abs_path, (signature, data) in entries.items():
+                if signatures[abs_path] != signature:
+                    self._forget(abs_path)
+                    self._pending_deletes.add(abs_path)
+                    continue
+                if abs_path in fetched and not stale:
+                    self._remember(abs_path, fetched[abs_path])
+                self._pending_access[abs_path] = now
+                result[abs_path] = data
+            try:
+                self._flush_if_needed()
+            except sqlite3.OperationalError:
+                # 其他进程长时间占用写锁，访问时间与删除操作可以丢弃
+                pass
+        return result
+
+    def _flush_if_needed(self):
+        pending = (
+            len(self._pending_access)
+            + len(self._pending_deletes)
+            + len(self._pending_writes)
+        )
+        if pending >= self.flush_threshold:
+            with self._transaction():
+                self._write_pending()
+
+    def _write_pending(self):
+        """在当前事务中写入暂存的记录、访问时间与删除操作"""
+        if self._pending_deletes:
+            self.conn.executemany(
+                "DELETE FROM file_cache WHERE file_abs_path = ?",
+                [(p,) for p in self._pending_deletes],
+            )
+            self._pending_deletes.clear()
+        if self._pending_writes:
+            now = time.time()
+            self._insert_rows(
+                (p, signature, now, data)
+                for p, (signature, data) in self._pending_writes.items()
             )
+            self._pending_writes.clear()
+        if self._pending_access:
+            self.conn.executemany(
+                "UPDATE file_cache SET cache_last_access = ? WHERE file_abs_path = ?",
+                [(t, p) for p, t in self._pending_access.items()],
+            )
+            self._pending_access.clear()
 
-    def _lru_evict(self):
-        """【仅析构调用】LRU 淘汰超量数据"""
-        if self.max_size <= 0:
-            return
-        self._batch_clean_invalid()
-        self._sql(
+    def _insert_rows(self, rows: Iterable[tuple[str, Signature, float, dict]]):
+        # 使用 UPSERT 而不是 REPLACE，以便由 UPDATE 触发器维护数据总量
+        values = [(p, *sig, t, json.dumps(data)) for p, sig, t, data in rows]
+        self.conn.executemany(
             """
-            DELETE FROM file_cache
-            WHERE file_abs_path IN (
-                SELECT file_abs_path FROM file_cache
-                ORDER BY cache_last_access ASC
-                LIMIT MAX(0, (SELECT COUNT(*) FROM file_cache) - ?)
-            )
+            INSERT INTO file_cache
+            (file_abs_path, file_mtime_ns, file_size, file_ino, file_dev,
+             cache_last_access, user_data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (file_abs_path) DO UPDATE SET
+                file_mtime_ns = excluded.file_mtime_ns,
+                file_size = excluded.file_size,
+                file_ino = excluded.file_ino,
+                file_dev = excluded.file_dev,
+                cache_last_access = excluded.cache_last_access,
+                user_data = excluded.user_data
         """,
-            (self.max_size,),
-            commit=True,
+            values,
         )
+        self._writes_since_maintenance += len(values)
+        # 容量限制在每次写入的同一事务中执行，只查询一行统计信息
+        self._evict_oldest(self.maintenance_batch)
 
-    def _update_timestamp(self, abs_path: str):
-        """更新缓存记录访问时间"""
-        self._sql(
-            "UPDATE file_cache SET cache_last_access = ? WHERE file_abs_path = ?",
-            (time.time(), abs_path),
-            commit=True,
-        )
+    def _write_records(self, data: Mapping[str, dict], merge: bool):
+        """写入多条记录，merge 为 True 时与已有字段合并
+
+        stat 在锁外进行，写事务只包含数据库读写。
+        """
+        signatures = self._get_signatures(data)
+        with self.lock:
+            if self.write_mode == "back":
+                existing = self._load(list(data)) if merge else {}
+                entries = self._merge_entries(data, signatures, existing, merge)
+                self._pending_writes.update(entries)
+                self._flush_if_needed()
+            else:
+                now = time.time()
+                with self._transaction():
+                    # 在写事务中读取已有字段，其他进程无法在读取与写入之间插入修改
+                    existing = self._fetch_records(list(data)) if merge else {}
+                    entries = self._merge_entries(data, signatures, existing, merge)
+                    self._write_pending()
+                    self._insert_rows(
+                        (p, sig, now, d) for p, (sig, d) in entries.items()
+                    )
 
-    def _get_record(self, abs_path: str) -> dict | None:
-        """获取缓存记录（包含所有字段）"""
-        res = self._sql(
-            "SELECT user_data FROM file_cache WHERE file_abs_path = ?", (abs_path,)
+            if self._writes_since_maintenance >= self.maintenance_writes:
+                self._maintain(self.maintenance_batch)
+
+    def _merge_entries(
+        self,
+        data: Mapping[str, dict],
+        signatures: Mapping[str, Signature | None],
+        existing: Mapping[str, Entry],
+        merge: bool,
+    ) -> dict[str, Entry]:
+        self._generation += 1
+        entries: dict[str, Entry] = {}
+        for abs_path, fields in data.items():
+            signature = signatures[abs_path]
+            if signature is None:
+                continue
+            if merge and abs_path in existing:
+                old_signature, old_data = existing[abs_path]
+                # 源文件已变化时旧字段不再可信
+                current = dict(old_data) if old_signature == signature else {}
+                current.update(fields)
+                fields = current
+            entries[abs_path] = (signature, dict(fields))
+            self._pending_deletes.discard(abs_path)
+            self._pending_access.pop(abs_path, None)
+            self._remember(abs_path, entries[abs_path])
+        return entries
+
+    def _clean_invalid(self, limit: int) -> int:
+        """从上次的位置继续，检查至多 limit 条记录并删除失效的记录"""
+        rows = self.conn.execute(
+            "SELECT rowid, file_abs_path, file_mtime_ns, file_size, file_ino, file_dev "
+            "FROM file_cache WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (self._scan_rowid, limit),
+        ).fetchall()
+        # 扫描到末尾后下次从头开始
+        self._scan_rowid = rows[-1][0] if len(rows) == limit else 0
+        signatures = self._get_signatures(row[1] for row in rows)
+        invalid = [(row[1],) for row in rows if signatures[row[1]] != tuple(row[2:])]
+        for (abs_path,) in invalid:
+            self._forget(abs_path)
+        self.conn.executemany("DELETE FROM file_cache WHERE file_abs_path = ?", invalid)
+        return len(invalid)
+
+    def _count_excess(self) -> int:
+        """超出 max_size 或 max_bytes 的记录条数，由 file_cache_meta 直接得出"""
+        row_count, total_bytes = self.conn.execute(
+            "SELECT row_count, total_bytes FROM file_cache_meta"
         ).fetchone()
-        return json.loads(res[0]) if res else None
+        excess = row_count - self.max_size if self.max_size > 0 else 0
+        if 0 < self.max_bytes < total_bytes:
+            # 按平均记录大小估算需要淘汰的条数
+            average = total_bytes / max(1, row_count)
+            excess = max(excess, int((total_bytes - self.max_bytes) / average) + 1)
+        return excess
+
+    def _evict_oldest(self, batch: int) -> int:
+        """按最近访问时间淘汰记录直到不再超出限制，每条语句至多处理 batch 条"""
+        if self.max_size <= 0 and self.max_bytes <= 0:
+            return 0
+        removed = 0
+        while (count := min(batch, self._count_excess())) > 0:
+            victims = self.conn.execute(
+                "SELECT file_abs_path FROM file_cache "
+                "ORDER BY cache_last_access ASC LIMIT ?",
+                (count,),
+            ).fetchall()
+            if not victims:
+                break
+            for (abs_path,) in victims:
+                self._forget(abs_path)
+            self.conn.executemany(
+                "DELETE FROM file_cache WHERE file_abs_path = ?", victims
+            )
+            removed += len(victims)
+        return removed
+
+    def _maintain(self, batch: int) -> int:
+        with self._transaction():
+            self._write_pending()
+            removed = self._clean_invalid(batch)
+            removed += self._evict_oldest(batch)
+        self._writes_since_maintenance = 0
+        return removed
+
+    @staticmethod
+    def _maintenance_loop(
+        ref: "weakref.ref[FileInfoCache]", stop_event: threading.Event, interval: float
+    ):
+        while not stop_event.wait(interval):
+            cache = ref()
+            if cache is None:
+                return
+            try:
+                cache.maintain()
+            except sqlite3.Error:
+                pass
+            del cache
 
     # ====================== 语义化公有 API ======================
     def get(self, file_path: str | Path, key: str):
         """【单个字段】获取值"""
         abs_path = self._get_abs_path(file_path)
-        with self.lock:
-            if not self._validate(abs_path):
-                return None
-
-            # 更新访问时间
-            self._update_timestamp(abs_path)
-            data = self._get_record(abs_path)
-            if data is None:
-                return None
-            return data.get(key)
+        data = self._read_valid([abs_path]).get(abs_path)
+        return data.get(key) if data is not None else None
 
     def get_fields(self, file_path: str | Path, *keys: str) -> dict:
         """【完整字典】获取所有缓存字段"""
-        with self.lock:
-            abs_path = self._get_abs_path(file_path)
-            if not self._validate(abs_path):
-                return {}
+        abs_path = self._get_abs_path(file_path)
+        data = self._read_valid([abs_path]).get(abs_path)
+        if data is None:
+            return {}
+        if not keys:
+            return dict(data)
+        return {k: data.get(k) for k in keys}
 
-            self._update_timestamp(abs_path)
-            data = self._get_record(abs_path)
-            if data is None:
-                return {}
-            if not keys:
-                return data
-            return {k: data.get(k) for k in keys}
+    def get_many(
+        self, file_paths: Iterable[str | Path], key: str
+    ) -> dict[Path, object]:
+        """【批量】获取多个文件的同一字段，只返回命中的文件"""
+        abs_paths = {self._get_abs_path(x): Path(x) for x in file_paths}
+        records = self._read_valid(list(abs_paths))
+        return {abs_paths[p]: data[key] for p, data in records.items() if key in data}
 
     def set(self, file_path: str | Path, key: str, value):
         """【单个字段】设置值（自动创建缓存）"""
-        with self.lock:
-            abs_path = self._get_abs_path(file_path)
-            if not os.path.exists(abs_path):
-                return
+        self.update_fields(file_path, **{key: value})
 
-            # 读取现有数据或新建
-            res = self._sql(
-                "SELECT user_data FROM file_cache WHERE file_abs_path = ?", (abs_path,)
-            ).fetchone()
-            data = json.loads(res[0]) if res else {}
-            data[key] = value
-
-            # 写入数据库
-            now = time.time()
-            mtime = os.path.getmtime(abs_path)
-            self._sql(
-                """
-                INSERT OR REPLACE INTO file_cache
-                (file_abs_path, file_mtime, cache_last_access, user_data)
-                VALUES (?, ?, ?, ?)
-            """,
-                (abs_path, mtime, now, json.dumps(data)),
-                commit=True,
-            )
+    def set_many(self, key: str, values: Mapping[str | Path, object]):
+        """【批量】为多个文件设置同一字段，在一个事务中完成"""
+        data = {self._get_abs_path(p): {key: v} for p, v in values.items()}
+        self._write_records(data, merge=True)
 
     def set_fields(self, file_path: str | Path, data: dict):
         """【完整字典】覆盖设置所有字段"""
-        with self.lock:
-            abs_path = self._get_abs_path(file_path)
-            if not os.path.exists(abs_path):
-                return
-
-            now = time.time()
-            mtime = os.path.getmtime(abs_path)
-            self._sql(
-                """
-                INSERT OR REPLACE INTO file_cache
-                (file_abs_path, file_mtime, cache_last_access, user_data)
-                VALUES (?, ?, ?, ?)
-            """,
-                (abs_path, mtime, now, json.dumps(data)),
-                commit=True,
-            )
+        self._write_records({self._get_abs_path(file_path): data}, merge=False)
 
     def update_fields(self, file_path: str | Path, **data):
         """【增量更新】仅更新指定字段，不覆盖其他"""
-        with self.lock:
-            abs_path = self._get_abs_path(file_path)
-            if not os.path.exists(abs_path):
-                return
+        self._write_records({self._get_abs_path(file_path): data}, merge=True)
 
-            res = self._sql(
-                "SELECT user_data FROM file_cache WHERE file_abs_path = ?", (abs_path,)
-            ).fetchone()
-            current_data = json.loads(res[0]) if res else {}
-            current_data.update(data)
-
-            now = time.time()
-            mtime = os.path.getmtime(abs_path)
-            self._sql(
-                """
-                INSERT OR REPLACE INTO file_cache
-                (file_abs_path, file_mtime, cache_last_access, user_data)
-                VALUES (?, ?, ?, ?)
-            """,
-                (abs_path, mtime, now, json.dumps(current_data)),
-                commit=True,
-            )
+    def update_many(self, data: Mapping[str | Path, dict]):
+        """【批量增量更新】在一个事务中更新多个文件的指定字段"""
+        records = {self._get_abs_path(p): dict(v) for p, v in data.items()}
+        self._write_records(records, merge=True)
 
     def delete(self, file_path: str | Path):
         """删除单条缓存"""
-        with self.lock:
+        with self.lock, self._transaction():
             abs_path = self._get_abs_path(file_path)
-            self._sql(
-                "DELETE FROM file_cache WHERE file_abs_path = ?",
-                (abs_path,),
-                commit=True,
+            self._forget(abs_path)
+            self._pending_deletes.discard(abs_path)
+            self.conn.execute(
+                "DELETE FROM file_cache WHERE file_abs_path = ?", (abs_path,)
             )
 
     def clear(self):
         """清空所有缓存"""
+        with self.lock, self._transaction():
+            self._generation += 1
+            self._pending_access.clear()
+            self._pending_deletes.clear()
+            self._pending_writes.clear()
+            self._memory.clear()
+            self.conn.execute("DELETE FROM file_cache")
+
+    def maintain(self, batch: int | None = None) -> int:
+        """执行一轮增量维护，返回删除的记录数"""
         with self.lock:
-            self._sql("DELETE FROM file_cache", commit=True)
+            if self._closed:
+                return 0
+            return self._maintain(batch or self.maintenance_batch)
+
+    def flush(self):
+        """提交暂存的记录、访问时间与删除操作"""
+        with self.lock:
+            if self._closed:
+                return
+            with self._transaction():
+                self._write_pending()
 
     def close(self):
-        """关闭数据库连接"""
+        """提交暂存操作并关闭所有线程的数据库连接，不做任何全表操作"""
+        self._stop_event.set()
+        if (
+            self._maintenance_thread is not None
+            and self._maintenance_thread is not threading.current_thread()
+        ):
+            self._maintenance_thread.join()
         with self.lock:
-            if self.conn:
-                self.conn.close()
+            if not self._closed:
+                with self._transaction():
+                    self._write_pending()
+                self._closed = True
+            with self._connections_lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections.clear()
 
-    # ====================== 析构：唯一淘汰入口 ======================
+    # ====================== 析构 ======================
     def __del__(self):
-        try:
-            with self.lock:
-                self._lru_evict()
-        finally:
-            self.close()
+        if getattr(self, "_closed", True):
+            return
+        self.close()
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class PathStatCache:
+    """带有效期的批量文件状态缓存
+
+    同一路径在 ttl 秒内只 stat 一次，目录的可写性也只检查一次。
+    prefetch 会对去重后的路径并发执行 stat，
+    在 NFS、SMB 等网络文件系统上可以把大量往返合并到一起。
+    """
+
+    def __init__(self, ttl: float = 10.0, max_workers: int = 8):
+        self.ttl = ttl
+        self.max_workers = max(1, max_workers)
+        self._lock = threading.Lock()
+        self._stats: dict[str, tuple[float, os.stat_result | None]] = {}
+        self._writable: dict[str, tuple[float, bool]] = {}
+
+    @staticmethod
+    def _key(path: str | Path) -> str:
+        return os.path.abspath(path)
+
+    def _is_valid(self, checked_at: float, now: float) -> bool:
+        return now - checked_at < self.ttl
+
+    @staticmethod
+    def _stat(key: str) -> os.stat_result | None:
+        try:
+            return os.stat(key)
+        except OSError:
+            return None
+
+    def stat(self, path: str | Path) -> os.stat_result | None:
+        """返回文件状态，文件不存在时返回 None"""
+        key = self._key(path)
+        now = time.monotonic()
+        cached = self._stats.get(key)
+        if cached is not None and self._is_valid(cached[0], now):
+            return cached[1]
+        result = self._stat(key)
+        with self._lock:
+            self._stats[key] = (now, result)
+        return result
+
+    def exists(self, path: str | Path) -> bool:
+        return self.stat(path) is not None
+
+    def is_writable_dir(self, path: str | Path) -> bool:
+        key = self._key(path)
+        now = time.monotonic()
+        cached = self._writable.get(key)
+        if cached is not None and self._is_valid(cached[0], now):
+            return cached[1]
+        result = self.exists(key) and os.access(key, os.W_OK)
+        with self._lock:
+            self._writable[key] = (now, result)
+        return result
+
+    def prefetch(self, paths: Iterable[str | Path]) -> None:
+        """并发获取尚未缓存或已过期的路径状态"""
+        now = time.monotonic()
+        keys = []
+        for key in {self._key(x) for x in paths}:
+            cached = self._stats.get(key)
+            if cached is None or not self._is_valid(cached[0], now):
+                keys.append(key)
+        if not keys:
+            return
+
+        if len(keys) == 1 or self.max_workers == 1:
+            results = list(map(self._stat, keys))
+        else:
+            with ThreadPoolExecutor(min(self.max_workers, len(keys))) as executor:
+                results = list(executor.map(self._stat, keys))
+
+        with self._lock:
+            for key, result in zip(keys, results):
+                self._stats[key] = (now, result)
+
+    def make_dirs(self, dirs: Iterable[str | Path]) -> list[Path]:
+        """创建不存在的目录，返回实际创建的目录列表"""
+        created = []
+        for key in sorted({self._key(x) for x in dirs}):
+            if self.exists(key):
+                continue
+            os.makedirs(key, exist_ok=True)
+            # 中间目录也可能被一并创建
+            for x in [key, *map(str, Path(key).parents)]:
+                self.invalidate(x)
+            created.append(Path(key))
+        return created
+
+    def invalidate(self, path: str | Path | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._stats.clear()
+                self._writable.clear()
+                return
+            key = self._key(path)
+            self._stats.pop(key, None)
+            self._writable.pop(key, None)
@@ -1,2 +1,4 @@
 from . import cx_streamutils as StreamUtils
 from . import cx_streamutils_async as AsyncStreamUtils
+from .cx_line_buffer import LineRingBuffer
+from .cx_line_splitter import LineSplitter
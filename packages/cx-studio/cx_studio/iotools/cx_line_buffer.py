@@ -0,0 +1,93 @@
+from collections import deque
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import IO
+
+
+class LineRingBuffer:
+    """只保留最后若干行文本的缓冲区
+
+    同时受行数 max_lines 和字节数 max_bytes 限制，超出的旧行会被丢弃；
+    指定 spill_file 时被丢弃的行会依次追加到该文件中，以便事后查阅完整输出。
+    spill_file 也可以是返回路径的函数，第一次有行被丢弃时才调用并创建文件。
+    只支持单个写入者。
+    """
+
+    def __init__(
+        self,
+        max_lines: int = 200,
+        max_bytes: int = 64 * 1024,
+        spill_file: Path | Callable[[], Path] | None = None,
+    ):
+        self.max_lines = max(1, max_lines)
+        self.max_bytes = max(1, max_bytes)
+        self.spill_file: Path | Callable[[], Path] | None = (
+            spill_file if callable(spill_file) or not spill_file else Path(spill_file)
+        )
+        self._lines: deque[tuple[str, int]] = deque()
+        self._bytes = 0
+        self._dropped = 0
+        self._spill: IO[str] | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[str]:
+        return (line for line, _size in list(self._lines))
+
+    @property
+    def dropped(self) -> int:
+        """被移出缓冲区的行数"""
+        return self._dropped
+
+    @property
+    def size(self) -> int:
+        return self._bytes
+
+    def _drop_oldest(self) -> None:
+        line, size = self._lines.popleft()
+        self._bytes -= size
+        self._dropped += 1
+        if self.spill_file is not None:
+            if self._spill is None:
+                if callable(self.spill_file):
+                    self.spill_file = Path(self.spill_file())
+                self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+                self._spill = open(self.spill_file, "a", encoding="utf-8")
+            self._spill.write(line)
+            self._spill.write("\n")
+
+    def append(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        size = len(line.encode("utf-8", errors="ignore"))
+        if size > self.max_bytes:
+            # 单行超过上限时只保留行尾
+            line = line[-self.max_bytes :]
+            size = len(line.encode("utf-8", errors="ignore"))
+
+        self._lines.append((line, size))
+        self._bytes += size
+        while len(self._lines) > self.max_lines or (
+            self._bytes > self.max_bytes and len(self._lines) > 1
+        ):
+            self._drop_oldest()
+
+    def lines(self) -> list[str]:
+        return list(self)
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self._bytes = 0
+        self._dropped = 0
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
@@ -0,0 +1,59 @@
+import re
+
+_SEPARATOR_PATTERN = re.compile(rb"[\r\n]+")
+
+
+class LineSplitter:
+    """增量式的行分割器
+
+    以连续的 \\r 与 \\n 作为分隔符，空行会被忽略。
+    每次只在新加入的数据中查找分隔符，已完成的行直接从缓冲区头部移除，
+    因此长行或长时间没有换行的输出也只需线性时间。
+    超过 max_line_length 的行会被强制切开，避免缓冲区无限增长。
+    """
+
+    def __init__(self, max_line_length: int = 1024 * 1024):
+        self.max_line_length = max(1, max_line_length)
+        self._buffer = bytearray()
+
+    def _limit(self, line: bytes) -> list[bytes]:
+        n = self.max_line_length
+        return [line[i : i + n] for i in range(0, len(line), n)]
+
+    def feed(self, data: bytes) -> list[bytes]:
+        buffer = self._buffer
+        # 缓冲区中残留的数据不包含分隔符，只需扫描新数据
+        scan_start = len(buffer)
+        buffer += data
+
+        last_separator = max(
+            buffer.rfind(b"\n", scan_start), buffer.rfind(b"\r", scan_start)
+        )
+        lines = []
+        consumed = 0
+        if last_separator >= 0:
+            consumed = last_separator + 1
+            with memoryview(buffer) as view:
+                completed = bytes(view[:consumed])
+            lines = [x for x in _SEPARATOR_PATTERN.split(completed) if x]
+            if consumed > self.max_line_length:
+                lines = [y for x in lines for y in self._limit(x)]
+
+        # 迟迟没有换行时，把超长的部分作为独立的行输出
+        remaining = len(buffer) - consumed
+        if remaining > self.max_line_length:
+            cut = consumed + remaining - remaining % self.max_line_length
+            with memoryview(buffer) as view:
+                lines += self._limit(bytes(view[consumed:cut]))
+            consumed = cut
+
+        del buffer[:consumed]
+        return lines
+
+    def flush(self) -> list[bytes]:
+        """取出最后一个没有换行符结尾的行"""
+        if not self._buffer:
+            return []
+        result = [bytes(self._buffer)]
+        self._buffer.clear()
+        return result
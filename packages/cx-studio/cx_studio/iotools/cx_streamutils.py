@@ -1,9 +1,10 @@
 import io
-import re
 import subprocess
 import sys
 from typing import IO, Any, Iterable
 
+from .cx_line_splitter import LineSplitter
+
 
 def create_subprocess(*args: Any, **kwargs: Any) -> subprocess.Popen:
     # On Windows, CREATE_NEW_PROCESS_GROUP flag is required to use CTRL_BREAK_EVENT signal,
@@ -32,20 +33,15 @@ def read_stream(stream: IO[bytes], size: int = -1) -> Iterable[bytes]:
         yield chunk
 
 
-def readlines_from_stream(stream: IO[bytes]) -> Iterable[bytes]:
-    pattern = re.compile(rb"[\r\n]+")
-
-    buffer = bytearray()
-    for chunk in read_stream(stream, io.DEFAULT_BUFFER_SIZE):
-        buffer.extend(chunk)
-
-        lines = pattern.split(buffer)
-        buffer[:] = lines.pop(-1)  # keep the last line that could be partial
-
-        yield from lines
-
-    if buffer:
-        yield bytes(buffer)
+def readlines_from_stream(
+    stream: IO[bytes],
+    chunk_size: int = io.DEFAULT_BUFFER_SIZE,
+    max_line_length: int = 1024 * 1024,
+) -> Iterable[bytes]:
+    splitter = LineSplitter(max_line_length)
+    for chunk in read_stream(stream, chunk_size):
+        yield from splitter.feed(chunk)
+    yield from splitter.flush()
 
 
 def record_stream(stream: IO[bytes] | None) -> bytes:
@@ -1,11 +1,12 @@
 import asyncio
 import io
-import re
 import subprocess
 import sys
 from collections.abc import AsyncIterable, Awaitable
 from typing import Any
 
+from .cx_line_splitter import LineSplitter
+
 
 def create_subprocess(
     *args: Any, **kwargs: Any
@@ -39,21 +40,17 @@ async def read_stream(
         yield chunk
 
 
-async def readlines_from_stream(stream: asyncio.StreamReader) -> AsyncIterable[bytes]:
-    pattern = re.compile(rb"[\r\n]+")
-
-    buffer = bytearray()
-    async for chunk in read_stream(stream, io.DEFAULT_BUFFER_SIZE):
-        buffer.extend(chunk)
-
-        lines = pattern.split(buffer)
-        buffer[:] = lines.pop(-1)  # keep the last line that could be partial
-
-        for x in lines:
-            yield x
-
-    if buffer:
-        yield bytes(buffer)
+async def readlines_from_stream(
+    stream: asyncio.StreamReader,
+    chunk_size: int = io.DEFAULT_BUFFER_SIZE,
+    max_line_length: int = 1024 * 1024,
+) -> AsyncIterable[bytes]:
+    splitter = LineSplitter(max_line_length)
+    async for chunk in read_stream(stream, chunk_size):
+        for line in splitter.feed(chunk):
+            yield line
+    for line in splitter.flush():
+        yield line
 
 
 async def record_stream(stream: asyncio.StreamReader | None) -> bytes:
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+
+from cx_studio.filesystem import FileInfoCache
+
+
+def make_files(folder: Path, count: int) -> list[Path]:
+    result = []
+    for i in range(count):
+        path = folder / f"{i:06d}.bin"
+        path.write_bytes(b"x")
+        result.append(path)
+    return result
+
+
+def row_count(cache: FileInfoCache) -> int:
+    return cache.conn.execute("SELECT COUNT(*) FROM file_cache").fetchone()[0]
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> list[Path]:
+    return make_files(tmp_path, 5000)
+
+
+def test_max_size_per_call(tmp_path: Path, files: list[Path]):
+    cache = FileInfoCache(tmp_path / "cache.db", max_size=1000)
+    for i, path in enumerate(files):
+        cache.set(path, "value", i)
+        if i % 997 == 0:
+            assert row_count(cache) <= 1000
+    assert row_count(cache) <= 1000
+    # 最近写入的记录应当被保留
+    assert cache.get(files[-1], "value") == len(files) - 1
+    cache.close()
+
+
+def test_max_size_batch(tmp_path: Path, files: list[Path]):
+    cache = FileInfoCache(tmp_path / "cache.db", max_size=1000, maintenance_batch=100)
+    cache.set_many("value", {path: i for i, path in enumerate(files)})
+    assert row_count(cache) <= 1000
+    cache.close()
+
+
+def test_max_bytes(tmp_path: Path, files: list[Path]):
+    cache = FileInfoCache(tmp_path / "cache.db", max_bytes=20000)
+    cache.set_many("value", {path: "x" * 100 for path in files})
+    total_bytes = cache.conn.execute(
+        "SELECT total_bytes FROM file_cache_meta"
+    ).fetchone()[0]
+    assert total_bytes <= 20000
+    cache.close()
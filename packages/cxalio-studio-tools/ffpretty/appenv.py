@@ -1,7 +1,7 @@
 import signal
 from typing import override
 
-from cx_studio.filesystem.path_expander import CmdFinder
+from cx_studio.ffmpeg import FFmpegRegistry
 from cx_tools.app import IAppEnvironment
 from cx_wealth import rich_types as r
 
@@ -11,7 +11,7 @@ class AppEnv(IAppEnvironment):
         super().__init__()
         self.app_name = "FFpretty"
         self.app_version = "0.7.0"
-        self.ffmpeg_executable = CmdFinder.which("ffmpeg")
+        self.ffmpeg_executable = FFmpegRegistry.resolve("ffmpeg")
         self.debug_mode = False
 
         self.progress = r.Progress(
@@ -3,7 +3,7 @@ import json
 from pathlib import Path
 from typing import Any
 
-from cx_studio.filesystem.path_expander import CmdFinder
+from cx_studio.ffmpeg import FFmpegRegistry
 from cx_studio.iotools import AsyncStreamUtils
 from cx_tools.app.safe_error import SafeError
 from .appenv import appenv
@@ -13,7 +13,9 @@ from .info_elements import MediaInfo
 class Prober:
     def __init__(self, ffprobe_executable: str | Path | None = None):
         # 尝试找到ffprobe可执行文件，如果没有指定，则使用默认路径
-        self._ffprobe_executable = str(CmdFinder.which(ffprobe_executable or "ffprobe"))
+        self._ffprobe_executable = str(
+            FFmpegRegistry.resolve(ffprobe_executable or "ffprobe")
+        )
 
     async def get_details(self, file: Path) -> dict[str, Any]:
         """使用ffprobe获取媒体文件的详细信息"""
@@ -4,6 +4,7 @@ from pathlib import Path
 
 from cx_studio.ffmpeg import FFmpegAsync, FFmpegArgumentsPreProcessor
 from cx_studio.ffmpeg.cx_ff_infos import FFmpegCodingInfo
+from cx_studio.iotools import LineRingBuffer
 from cx_tools.app.safe_error import SafeError
 from cx_wealth import IndexedListPanel
 from .appenv import appenv
@@ -14,7 +15,7 @@ class Transcoder:
         self._ffmpeg = FFmpegAsync(ffmpeg_executable)
         self._task_id = None
         self._task_description = "Transcoding"
-        self._ffmpeg_outputs = []
+        self._ffmpeg_outputs = LineRingBuffer(max_lines=200)
 
     def __enter__(self):
         self._task_id = appenv.progress.add_task(
@@ -91,6 +92,8 @@ class Transcoder:
         m, n = len(inputs), len(outputs)
         summary = f"[blue][{m}->{n}][/]"
 
+        self._ffmpeg.on("verbose", self._on_verbose)
+
         # 设置状态更新监听器
         @self._ffmpeg.on("status_updated")
         def on_status_updated(status: FFmpegCodingInfo):
@@ -124,7 +127,13 @@ class Transcoder:
             appenv.progress.update(
                 self._task_id, description=f"{summary}[cx.error]转码失败[/]"  # type: ignore[arg-type]
             )
-            appenv.whisper(self._ffmpeg_outputs, title="FFmpeg 输出")
+            appenv.whisper(
+                IndexedListPanel(
+                    self._ffmpeg_outputs.lines(),
+                    title="FFmpeg 输出",
+                    start_index=self._ffmpeg_outputs.dropped + 1,
+                )
+            )
 
         try:
             main_task = asyncio.create_task(self._ffmpeg.execute(arguments))
@@ -12,7 +12,9 @@ class AppContext:
         self.script_output: str | None = None
         self.pretending_mode: bool = False
         self.debug_mode: bool = False
-        self.sort_mode: Literal["source", "preset", "target", "x"] = "x"
+        self.sort_mode: Literal[
+            "source", "preset", "target", "longest", "makespan", "x"
+        ] = "x"
         self.continue_mode: bool = False
         self.generate: bool = False
         self.save_script: str | None = None
@@ -22,6 +24,13 @@ class AppContext:
         self.output_dir: str | None = None
         self.show_help: bool = False
         self.max_workers: int = 1
+        self.probe_workers: int = 4
+        self.cpu_budget: float | None = None
+        self.gpu_sessions: int = 2
+        self.io_slots: int = 2
+        self.segments: int = 0
+        self.fan_out: bool = False
+        self.incremental: bool = False
 
         for k, v in kwargs.items():
             if k in self.__dict__:
@@ -60,17 +69,71 @@ class AppContext:
             "-j",
             "--jobs",
             "--max-workers",
-            help=_("指定最大工作线程数"),
+            help=_("指定最大工作线程数，0 表示按资源预算自动决定"),
             type=int,
             default=1,
             dest="max_workers",
             metavar=_("线程数"),
         )
+        parser.add_argument(
+            "--probe-jobs",
+            help=_("指定同时探测媒体信息的最大进程数"),
+            type=int,
+            default=4,
+            dest="probe_workers",
+            metavar=_("进程数"),
+        )
+        parser.add_argument(
+            "--cpu-budget",
+            help=_("指定可供调度的 CPU 核心数，默认为本机核心数"),
+            type=float,
+            default=None,
+            dest="cpu_budget",
+            metavar=_("核心数"),
+        )
+        parser.add_argument(
+            "--gpu-sessions",
+            help=_("指定同时运行的硬件编解码会话数"),
+            type=int,
+            default=2,
+            dest="gpu_sessions",
+            metavar=_("会话数"),
+        )
+        parser.add_argument(
+            "--io-slots",
+            help=_("指定同时进行的重度磁盘读写任务数"),
+            type=int,
+            default=2,
+            dest="io_slots",
+            metavar=_("槽位数"),
+        )
+        parser.add_argument(
+            "--segments",
+            help=_("将较长的单个源文件切分为若干段并行编码，0 表示不切分"),
+            type=int,
+            default=0,
+            dest="segments",
+            metavar=_("分段数"),
+        )
+        parser.add_argument(
+            "--fan-out",
+            help=_("将来源相同的任务合并为一次解码、多路输出"),
+            action="store_true",
+            default=False,
+            dest="fan_out",
+        )
+        parser.add_argument(
+            "--incremental",
+            help=_("跳过输出文件已是最新的任务"),
+            action="store_true",
+            default=False,
+            dest="incremental",
+        )
         parser.add_argument(
             "-c",
             "--continue",
             action="store_true",
-            help=_("重新加载上次运行的任务"),
+            help=_("重新加载上次运行中未完成的任务"),
             dest="continue_mode",
         )
 
@@ -85,7 +148,7 @@ class AppContext:
         parser.add_argument(
             "--sort",
             help=_("指定任务排序方式"),
-            choices=["source", "preset", "target", "x"],
+            choices=["source", "preset", "target", "longest", "makespan", "x"],
             default="x",
             metavar=_("排序方式代码"),
             dest="sort_mode",
@@ -10,8 +10,12 @@ from cx_tools import FileSizeCounter
 from cx_tools.app import IAppEnvironment, ConfigManager
 from cx_tools.i18n import _
 from cx_studio.core.cx_time import CxTime
+from cx_studio.filesystem import ensure_parents, PathStatCache
 from cx_wealth import rich_types as r
 from media_killer.components.exception import SafeError
+from media_killer.components.hwaccel_cache import HWAccelCache
+from media_killer.components.output_fingerprints import OutputFingerprints
+from media_killer.components.probe_cache import ProbeCache
 from .appcontext import AppContext
 
 
@@ -41,10 +45,38 @@ class AppEnv(IAppEnvironment):
         self.config_manager = ConfigManager(self.app_name)
         self._garbage_files = []
         self._app_start_time: datetime
+        self._probe_cache: ProbeCache | None = None
+        self._hwaccel_cache: HWAccelCache | None = None
+        self._output_fingerprints: OutputFingerprints | None = None
+        self.path_stat_cache = PathStatCache()
 
         self.input_filesize_counter = FileSizeCounter()
         self.output_filesize_counter = FileSizeCounter()
 
+    @property
+    def probe_cache(self) -> ProbeCache:
+        if self._probe_cache is None:
+            self._probe_cache = ProbeCache(
+                ensure_parents(self.config_manager.get_file("probe_cache.db"))
+            )
+        return self._probe_cache
+
+    @property
+    def hwaccel_cache(self) -> HWAccelCache:
+        if self._hwaccel_cache is None:
+            self._hwaccel_cache = HWAccelCache(
+                self.config_manager.get_file("hwaccel_failures.json")
+            )
+        return self._hwaccel_cache
+
+    @property
+    def output_fingerprints(self) -> OutputFingerprints:
+        if self._output_fingerprints is None:
+            self._output_fingerprints = OutputFingerprints(
+                ensure_parents(self.config_manager.get_file("output_cache.db"))
+            )
+        return self._output_fingerprints
+
     def is_debug_mode_on(self) -> bool:
         return self.context.debug_mode
 
@@ -61,6 +93,13 @@ class AppEnv(IAppEnvironment):
         self.progress.stop()
         self.clean_garbage_files()
         self.config_manager.remove_old_log_files()
+        # 提交暂存的记录、停止后台维护并关闭所有连接；硬件加速记录每次失败时即已写入文件
+        if self._probe_cache is not None:
+            self._probe_cache.close()
+            self._probe_cache = None
+        if self._output_fingerprints is not None:
+            self._output_fingerprints.close()
+            self._output_fingerprints = None
 
         input_filesize = self.input_filesize_counter.total_size
         output_filesize = self.output_filesize_counter.total_size
@@ -1,12 +1,14 @@
 from collections.abc import Iterable, Sequence
 import asyncio
 import importlib.resources
+import os
 import sys
 from pathlib import Path
 from typing import override
 
+from cx_studio.core import CxTime
 from cx_studio.filesystem import force_suffix
-from cx_tools.app import IApplication
+from cx_tools.app import IApplication, ProgressTaskAgent
 from cx_tools.i18n import _
 from cx_wealth import DynamicColumns, IndexedListPanel, WealthDetailPanel
 from .appenv import appenv
@@ -14,10 +16,12 @@ from .components.exception import SafeError
 from .components.input_scanner import InputScanner
 from .components.mission import Mission
 from .components.mission_arranger import MissionArranger
+from .components.mission_journal import MissionJournal
 from .components.mission_maker import MissionMaker
 from .components.mission_master import MissionMaster
 from .components.mission_xml import MissionXML
 from .components.preset import Preset
+from .components.resource_pool import ResourceCost
 from .components.script_maker import ScriptMaker
 from .mk_help_info import MKHelp
 
@@ -28,6 +32,9 @@ class Application(IApplication):
         self.presets: list[Preset] = []
         self.sources: list[Path] = []
         self.missions: list[Mission] = []
+        self.journal = MissionJournal(
+            appenv.config_manager.get_file("mission_journal.jsonl")
+        )
 
     def start(self) -> None:
         appenv.load_arguments(self.sys_arguments)
@@ -36,8 +43,7 @@ class Application(IApplication):
         return self  # type: ignore[return]  # 链式调用语法糖，基类契约返回 None
 
     def stop(self) -> None:
-        if not appenv.context.continue_mode:
-            self.save_missions(self.missions)
+        self.journal.close()
         appenv.whisper("Bye ~")
         appenv.stop()
 
@@ -56,21 +62,14 @@ class Application(IApplication):
             result = True
         return result  # type: ignore[return]  # super().__exit__ 可能返回 None, 但我们的路径保证非 None
 
-    @staticmethod
-    def save_missions(missions: list[Mission]):
-        mission_xml = MissionXML()
-        mission_xml.add_missions(missions)
-        mission_xml.save(appenv.config_manager.get_file("last_missions.xml"))
-
-    @staticmethod
-    def load_missions() -> list[Mission]:
+    def load_missions(self) -> list[Mission]:
+        # 优先从任务日志中恢复未完成的任务，旧版本留下的任务列表仅作为后备
+        if self.journal.path.exists():
+            return list(MissionJournal.iter_unfinished(self.journal.path))
         last_missions = appenv.config_manager.get_file("last_missions.xml")
         if not last_missions.exists():
             return []
-        mission_xml = MissionXML.load(
-            appenv.config_manager.get_file("last_missions.xml")
-        )
-        return list(mission_xml.iter_missions())
+        return list(MissionXML.iter_file(last_missions))
 
     @staticmethod
     def export_example_preset(filename: Path):
@@ -114,11 +113,63 @@ class Application(IApplication):
                 ).format(preset_count=len(self.presets), source_count=len(self.sources))
             )
 
+    @staticmethod
+    async def probe_durations(missions: Iterable[Mission]) -> dict[Mission, float]:
+        sources = {(m.ffmpeg, m.source) for m in missions}
+        durations: dict[tuple[str, Path], float] = {}
+        semaphore = asyncio.Semaphore(appenv.context.probe_workers or 1)
+
+        async with ProgressTaskAgent(
+            appenv.progress, task_name=_("探测媒体时长")
+        ) as task_agent:
+            task_agent.set_total(len(sources))
+            task_agent.start()
+
+            async def probe(ffmpeg: str, source: Path) -> None:
+                async with semaphore:
+                    try:
+                        info = await appenv.probe_cache.get_basic_info(ffmpeg, source)
+                    except OSError:
+                        info = {}
+                duration = info.get("duration")
+                if duration:
+                    durations[(ffmpeg, source)] = duration.total_seconds
+                task_agent.advance()
+
+            await asyncio.gather(*(probe(f, s) for f, s in sources))
+
+        return {
+            m: durations[(m.ffmpeg, m.source)]
+            for m in missions
+            if (m.ffmpeg, m.source) in durations
+        }
+
+    @staticmethod
+    def _make_budget() -> ResourceCost:
+        return ResourceCost(
+            cpu=appenv.context.cpu_budget or float(os.cpu_count() or 1),
+            gpu=appenv.context.gpu_sessions,
+            io=appenv.context.io_slots,
+        )
+
     def _sort_and_set_missions(self, missions: Iterable[Mission]) -> None:
         mission_list = list(
             missions
         )  # 转换为 list 以满足 MissionArranger 和 len 的类型要求
-        self.missions = list(MissionArranger(mission_list, appenv.context.sort_mode))
+        sort_mode = appenv.context.sort_mode
+        durations = None
+        if MissionArranger.needs_durations(sort_mode):
+            durations = asyncio.run(self.probe_durations(mission_list))
+        arranger = MissionArranger(
+            mission_list,
+            sort_mode,
+            durations=durations,
+            # 与 MissionMaster 使用同一个并行数，估算的派发顺序与耗时才与实际一致
+            workers=MissionMaster.count_workers(
+                mission_list, appenv.context.max_workers, self._make_budget()
+            ),
+        )
+        self.missions = list(arranger)
         # 检查任务数量并判断是否运行
         if not self.missions:
             raise SafeError(_("没有任务需要执行。"))
@@ -130,6 +181,13 @@ class Application(IApplication):
             )
         else:
             appenv.say(_("全部任务整理完毕，已按照设定方式排序。"))
+        if durations is not None:
+            wall_time = CxTime.from_seconds(arranger.estimated_wall_time(self.missions))
+            appenv.say(
+                _("按实时速度估算，全部任务预计耗时 {time_str}。").format(
+                    time_str=wall_time.pretty_string
+                )
+            )
         appenv.whisper(IndexedListPanel(self.missions, _("整理完的任务列表")))
 
     def run(self) -> None:
@@ -185,8 +243,22 @@ class Application(IApplication):
         if current_missions:
             appenv.say(_("生成了 {count} 个任务。").format(count=len(current_missions)))
         missions.extend(current_missions)
+        if appenv.context.fan_out:
+            merged_missions = MissionMaker.fan_out(missions)
+            if len(merged_missions) != len(missions):
+                appenv.say(
+                    _("已将 {old} 个任务合并为 {new} 个多路输出任务。").format(
+                        old=len(missions), new=len(merged_missions)
+                    )
+                )
+            missions = merged_missions
         self._sort_and_set_missions(missions)
 
+        # 假装模式不会产生任何结果，不应影响下次恢复
+        if not appenv.context.pretending_mode:
+            self.journal.open()
+            self.journal.add_missions(self.missions)
+
         # 生成脚本
         if appenv.context.save_script:
             maker = ScriptMaker(self.missions)
@@ -199,5 +271,11 @@ class Application(IApplication):
                 f"[dim]{_('检测到[italic cyan underline]假装模式[/]，将不会真正执行任何操作。')}[/]"
             )
 
-        mm = MissionMaster(self.missions, appenv.context.max_workers)
+        mm = MissionMaster(
+            self.missions,
+            appenv.context.max_workers,
+            probe_workers=appenv.context.probe_workers,
+            budget=self._make_budget(),
+            journal=None if appenv.context.pretending_mode else self.journal,
+        )
         asyncio.run(mm.run())
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from cx_studio.ffmpeg import FFmpegRegistry
+
+
+class HWAccelCache:
+    """硬件加速模式的选择与失败记录
+
+    根据 ffmpeg -hwaccels 的探测结果为任务挑选可用的硬件加速模式，
+    并按 ffmpeg 可执行文件和源视频编码持久化记录失败过的模式及其时间，
+    之后 ttl 秒内的任务会直接跳过已知无法工作的模式。
+    """
+
+    _VIDEO_CODEC_PATTERN = re.compile(r"Video:\s*(\w+)")
+    # 只匹配硬件设备或硬件解码初始化失败的报错，不匹配普通的信息输出
+    FAILURE_PATTERN = re.compile(
+        r"Device creation failed"
+        r"|Failed setup for format"
+        r"|hwaccel initialisation returned error"
+        r"|No device available for decoder"
+    )
+    DEFAULT_TTL = 7 * 24 * 3600
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL):
+        self._path = Path(path)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # {ffmpeg: {codec: {hwaccel: 失败时间}}}
+        self._failures: dict[str, dict[str, dict[str, float]]] = self._load()
+
+    def _load(self) -> dict[str, dict[str, dict[str, float]]]:
+        try:
+            with open(self._path, encoding="utf-8") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        result = {}
+        for executable, codecs in data.items():
+            if not isinstance(codecs, dict):
+                continue
+            # 旧版本不带时间的记录可能是误判，直接丢弃
+            result[executable] = {
+                codec: {str(k): float(v) for k, v in failed.items()}
+                for codec, failed in codecs.items()
+                if isinstance(failed, dict)
+            }
+        return result
+
+    def _save(self) -> None:
+        tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fp:
+                json.dump(self._failures, fp, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _executable_key(ffmpeg: str | Path) -> str:
+        return str(FFmpegRegistry.resolve(ffmpeg) or ffmpeg)
+
+    @classmethod
+    def video_codec_of(cls, basic_info: dict[str, Any]) -> str | None:
+        """从 get_basic_info 的结果中取出第一个视频流的编码"""
+        for stream in basic_info.get("streams") or []:
+            match = cls._VIDEO_CODEC_PATTERN.search(str(stream))
+            if match:
+                return match.group(1)
+        return None
+
+    def is_failed(self, ffmpeg: str | Path, codec: str | None, hwaccel: str) -> bool:
+        if not codec:
+            return False
+        codecs = self._failures.get(self._executable_key(ffmpeg), {})
+        failed_at = codecs.get(codec, {}).get(hwaccel)
+        # 驱动或硬件可能已经更新，过期的记录不再生效
+        return failed_at is not None and time.time() - failed_at < self._ttl
+
+    def record_failure(self, ffmpeg: str | Path, codec: str | None, hwaccel: str):
+        if not codec or hwaccel in ("", "none"):
+            return
+        with self._lock:
+            codecs = self._failures.setdefault(self._executable_key(ffmpeg), {})
+            codecs.setdefault(codec, {})[hwaccel] = time.time()
+            self._save()
+
+    @staticmethod
+    async def preload(executables: Iterable[str | Path]) -> None:
+        """在线程中预先探测各 ffmpeg 的能力，之后 choose 不会阻塞事件循环"""
+        await asyncio.gather(
+            *[FFmpegRegistry.get_capabilities_async(x) for x in set(executables)]
+        )
+
+    def choose(
+        self, ffmpeg: str | Path, preferred: str | None, codec: str | None = None
+    ) -> str:
+        """返回应当使用的硬件加速模式，无可用模式时返回 none"""
+        preferred = preferred or "auto"
+        if preferred == "none":
+            return preferred
+
+        capabilities = FFmpegRegistry.get_capabilities(ffmpeg)
+        if not capabilities.available:
+            # 无法探测时保持原样，由执行阶段报告 ffmpeg 的问题
+            return preferred
+
+        candidates = [preferred] if preferred == "auto" else [preferred, "auto"]
+        for hwaccel in candidates:
+            if hwaccel != "auto" and hwaccel not in capabilities.hwaccels:
+                continue
+            if hwaccel == "auto" and not capabilities.hwaccels:
+                continue
+            if self.is_failed(ffmpeg, codec, hwaccel):
+                continue
+            return hwaccel
+        return "none"
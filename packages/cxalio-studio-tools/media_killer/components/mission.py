@@ -11,6 +11,7 @@ from cx_studio.collectiontools import iter_with_separator
 from cx_studio.filesystem import get_basename, PathQuoteMode, quote_path
 from cx_wealth import rich_types as r
 from .argument_group import ArgumentGroup
+from .resource_pool import ResourceCost
 
 
 @dataclass(frozen=True)
@@ -30,6 +31,7 @@ class Mission:
     options: ArgumentGroup = field(default_factory=ArgumentGroup)
     inputs: list[ArgumentGroup] = field(default_factory=list)
     outputs: list[ArgumentGroup] = field(default_factory=list)
+    resource_cost: ResourceCost = field(default_factory=ResourceCost)
 
     @property
     def name(self):
@@ -84,6 +86,7 @@ class Mission:
         yield _("标准目标路径"), self.standard_target
         yield _("覆盖已存在的目标"), _("是") if self.overwrite else _("否")
         yield _("硬件加速模式"), self.hardware_accelerate
+        yield _("资源占用"), str(self.resource_cost)
         if self.options:
             yield _("通用参数（自定义）"), r.Columns(
                 self.options.iter_arguments(position_for_position_arguments="front")
@@ -1,4 +1,7 @@
-from collections.abc import Generator
+import bisect
+import heapq
+import statistics
+from collections.abc import Generator, Iterable, Mapping
 from operator import attrgetter
 from typing import Literal
 
@@ -6,22 +9,71 @@ from cx_wealth.wealth_label import WealthLabel
 from media_killer.appenv import appenv
 from .mission import Mission
 
+SortMode = Literal["source", "target", "preset", "longest", "makespan", "x"]
+
 
 class MissionArranger:
+    # makespan 模式中调整分配方案的最大轮数
+    MAKESPAN_ROUNDS = 200
+
     def __init__(
         self,
         missions: list[Mission],
-        sort_mode: Literal["source", "target", "preset", "x"] = "x",
+        sort_mode: SortMode = "x",
+        durations: Mapping[Mission, float] | None = None,
+        workers: int = 1,
     ):
         self.missions = missions
         self.sort_mode = sort_mode
+        self.durations = dict(durations or {})
+        self.workers = max(1, workers)
 
         self._sorters = {
             "source": self.__sort_by_source,
             "target": self.__sort_by_target,
             "preset": self.__sort_by_preset,
+            "longest": self.__sort_by_longest,
+            "makespan": self.__sort_by_makespan,
             "x": self.__no_sort,
         }
+        self._estimates: dict[Mission, float] | None = None
+
+    @staticmethod
+    def needs_durations(sort_mode: str) -> bool:
+        return sort_mode in ("longest", "makespan")
+
+    @staticmethod
+    def _source_size(mission: Mission) -> int:
+        try:
+            return mission.source.stat().st_size
+        except OSError:
+            return 0
+
+    def estimate_duration(self, mission: Mission) -> float:
+        """返回任务的预计时长（秒），未能探测到时长的任务按文件大小折算"""
+        if self._estimates is None:
+            self._estimates = self.__make_estimates()
+        return self._estimates.get(mission, 0)
+
+    def __make_estimates(self) -> dict[Mission, float]:
+        result: dict[Mission, float] = {}
+        rates = []
+        unknown = []
+        for m in self.missions:
+            duration = self.durations.get(m)
+            if duration:
+                result[m] = duration
+                size = self._source_size(m)
+                if size > 0:
+                    rates.append(size / duration)
+            else:
+                unknown.append(m)
+
+        # 使用已知任务的码率中位数把文件大小折算为时长，全部未知时直接比较大小
+        rate = statistics.median(rates) if rates else 1
+        for m in unknown:
+            result[m] = self._source_size(m) / rate
+        return result
 
     def __no_sort(self) -> Generator[Mission, None, None]:
         yield from self.missions
@@ -35,6 +87,89 @@ class MissionArranger:
     def __sort_by_preset(self) -> Generator[Mission, None, None]:
         yield from sorted(self.missions, key=lambda x: x.preset_id)
 
+    def __sort_by_longest(self) -> Generator[Mission, None, None]:
+        yield from sorted(self.missions, key=self.estimate_duration, reverse=True)
+
+    @staticmethod
+    def _best_exchange(
+        busy: list[tuple[float, int]], idle: list[tuple[float, int]], gap: float
+    ) -> tuple[int, int | None, float]:
+        """在最忙与最闲的两个工位之间寻找最能缩小差距的移动或交换
+
+        返回 (busy 中的位置, idle 中的位置或 None, 转移的工作量)，转移量越接近 gap / 2 越好。
+        """
+        best = (-1, None, 0.0)
+        best_peak = gap
+        idle_works = [x for x, _i in idle]
+        for a, (work, _i) in enumerate(busy):
+            # 直接移动
+            if 0 < work < gap and max(gap - work, work) < best_peak:
+                best, best_peak = (a, None, work), max(gap - work, work)
+            # 交换：希望对方的工作量接近 work - gap / 2
+            pos = bisect.bisect_left(idle_works, work - gap / 2)
+            for b in (pos - 1, pos):
+                if not 0 <= b < len(idle_works):
+                    continue
+                delta = work - idle_works[b]
+                if 0 < delta < gap and max(gap - delta, delta) < best_peak:
+                    best, best_peak = (a, b, delta), max(gap - delta, delta)
+        return best
+
+    def __sort_by_makespan(self) -> Generator[Mission, None, None]:
+        # 工作量以预计时长乘以预设声明的 CPU 占用计算，重度编码的任务更早开始。
+        works = [self.estimate_duration(m) * m.resource_cost.cpu for m in self.missions]
+        order = sorted(range(len(self.missions)), key=works.__getitem__, reverse=True)
+        if self.workers <= 1 or len(order) <= self.workers:
+            yield from (self.missions[i] for i in order)
+            return
+
+        # 先用 LPT 启发式把任务分配到 workers 个工位上
+        bins: list[list[tuple[float, int]]] = [[] for _i in range(self.workers)]
+        loads = [0.0] * self.workers
+        heap = [(0.0, n) for n in range(self.workers)]
+        for i in order:
+            load, n = heapq.heappop(heap)
+            bins[n].append((works[i], i))
+            loads[n] = load + works[i]
+            heapq.heappush(heap, (loads[n], n))
+
+        # 再反复在最忙与最闲的工位之间移动或交换任务，直到无法缩短最长的工位
+        for _i in range(self.MAKESPAN_ROUNDS):
+            hi = max(range(self.workers), key=loads.__getitem__)
+            lo = min(range(self.workers), key=loads.__getitem__)
+            bins[lo].sort()
+            a, b, delta = self._best_exchange(bins[hi], bins[lo], loads[hi] - loads[lo])
+            if a < 0:
+                break
+            moved = bins[hi].pop(a)
+            if b is not None:
+                bins[hi].append(bins[lo].pop(b))
+            bins[lo].append(moved)
+            loads[hi] -= delta
+            loads[lo] += delta
+
+        # 按计划的开始时间派发，执行时的列表调度会重现这一分配方案
+        planned = []
+        for jobs in bins:
+            start = 0.0
+            for work, i in sorted(jobs, reverse=True):
+                planned.append((start, -work, i))
+                start += work
+        yield from (self.missions[i] for _s, _w, i in sorted(planned))
+
+    @staticmethod
+    def estimate_makespan(durations: Iterable[float], workers: int = 1) -> float:
+        """按列表调度模拟 workers 个工位依次领取任务，返回全部完成所需的时长"""
+        loads = [0.0] * max(1, workers)
+        for duration in durations:
+            heapq.heapreplace(loads, loads[0] + duration)
+        return max(loads)
+
+    def estimated_wall_time(self, missions: Iterable[Mission]) -> float:
+        return self.estimate_makespan(
+            map(self.estimate_duration, missions), self.workers
+        )
+
     def __iter__(self) -> Generator[Mission, None, None]:
         cache = set()
         for m in self._sorters[self.sort_mode]():
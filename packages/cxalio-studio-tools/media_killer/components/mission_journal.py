@@ -0,0 +1,89 @@
+from __future__ import annotations
+import json
+from collections.abc import Generator, Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Literal
+
+from cx_studio.filesystem import ensure_parents
+from .mission import Mission
+from .mission_json import MissionJSON
+
+MissionState = Literal["queued", "running", "done", "failed"]
+
+
+class MissionJournal:
+    """只追加写入的任务日志（JSONL）
+
+    每一行记录一次任务状态变化，写入后立即 flush，
+    进程崩溃或被杀死时最多丢失正在写入的最后一行。
+    恢复时重放整个日志，只返回最后状态不是 done 的任务。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file: IO[str] | None = None
+
+    def __enter__(self) -> MissionJournal:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.close()
+        return False
+
+    def open(self) -> None:
+        """开始新的日志，旧的日志内容将被丢弃"""
+        self.close()
+        self._file = open(ensure_parents(self.path), "w", encoding="utf-8")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: dict) -> None:
+        if self._file is None:
+            return
+        record["time"] = datetime.now().isoformat(timespec="seconds")
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+        self._file.flush()
+
+    def add_missions(self, missions: Iterable[Mission]) -> None:
+        for mission in missions:
+            self._write(
+                {
+                    "id": str(mission.mission_id),
+                    "state": "queued",
+                    "mission": MissionJSON.encode_mission(mission),
+                }
+            )
+
+    def mark(self, mission: Mission, state: MissionState) -> None:
+        self._write({"id": str(mission.mission_id), "state": state})
+
+    @staticmethod
+    def iter_unfinished(path: Path) -> Generator[Mission]:
+        path = Path(path)
+        if not path.exists():
+            return
+
+        missions: dict[str, Mission] = {}
+        states: dict[str, str] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 被中断时写了一半的行
+                    continue
+                mission_id = record.get("id")
+                if not mission_id:
+                    continue
+                if "mission" in record:
+                    missions[mission_id] = MissionJSON.decode_mission(record["mission"])
+                states[mission_id] = record.get("state", "queued")
+
+        for mission_id, mission in missions.items():
+            if states.get(mission_id) != "done":
+                yield mission
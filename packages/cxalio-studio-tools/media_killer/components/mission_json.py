@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Any
+
+import ulid
+
+from .argument_group import ArgumentGroup
+from .mission import Mission
+from .resource_pool import ResourceCost
+
+
+class MissionJSON:
+    """Mission 与 JSON 兼容字典之间的编解码，供任务日志逐行记录任务使用"""
+
+    @staticmethod
+    def _encode_argument_group(group: ArgumentGroup) -> dict[str, Any]:
+        result: dict[str, Any] = {"arguments": list(group.iter_arguments())}
+        if group.filename:
+            result["filename"] = str(group.filename)
+        return result
+
+    @staticmethod
+    def _decode_argument_group(data: dict[str, Any]) -> ArgumentGroup:
+        filename = data.get("filename")
+        return ArgumentGroup(
+            options=list(data.get("arguments") or []),
+            filename=Path(filename) if filename else None,
+        )
+
+    @staticmethod
+    def encode_mission(mission: Mission) -> dict[str, Any]:
+        return {
+            "mission_id": str(mission.mission_id),
+            "preset_id": mission.preset_id,
+            "preset_name": mission.preset_name,
+            "ffmpeg": mission.ffmpeg,
+            "source": str(mission.source),
+            "standard_target": str(mission.standard_target),
+            "overwrite": mission.overwrite,
+            "hardware_accelerate": mission.hardware_accelerate,
+            "resource": {
+                "cpu": mission.resource_cost.cpu,
+                "gpu": mission.resource_cost.gpu,
+                "io": mission.resource_cost.io,
+            },
+            "options": MissionJSON._encode_argument_group(mission.options),
+            "inputs": [MissionJSON._encode_argument_group(x) for x in mission.inputs],
+            "outputs": [MissionJSON._encode_argument_group(x) for x in mission.outputs],
+        }
+
+    @staticmethod
+    def decode_mission(data: dict[str, Any]) -> Mission:
+        return Mission(
+            preset_id=str(data.get("preset_id")),
+            preset_name=str(data.get("preset_name")),
+            ffmpeg=data.get("ffmpeg") or "ffmpeg",
+            source=Path(data.get("source") or ""),
+            standard_target=Path(data.get("standard_target") or ""),
+            overwrite=bool(data.get("overwrite")),
+            hardware_accelerate=data.get("hardware_accelerate") or "auto",
+            options=MissionJSON._decode_argument_group(data.get("options") or {}),
+            inputs=[
+                MissionJSON._decode_argument_group(x) for x in data.get("inputs", [])
+            ],
+            outputs=[
+                MissionJSON._decode_argument_group(x) for x in data.get("outputs", [])
+            ],
+            resource_cost=ResourceCost.from_dict(data.get("resource")),
+            mission_id=ulid.from_str(str(data.get("mission_id"))),
+        )
@@ -2,6 +2,7 @@ import asyncio
 import itertools
 import threading
 from collections.abc import Sequence, Generator, Iterable
+from dataclasses import replace
 from pathlib import Path
 
 from cx_tools.app import ProgressTaskAgent
@@ -12,6 +13,7 @@ from .argument_group import ArgumentGroup
 from .mission import Mission
 from .preset import Preset
 from .preset_tag_replacer import PresetTagReplacer
+from .resource_pool import ResourceCost
 from .source_expander import SourceExpander
 from ..appenv import appenv
 
@@ -51,6 +53,14 @@ class MissionMaker:
         if appenv.context.force_no_overwrite:
             _overwrite = False
 
+        # 已有探测缓存时可以直接按源视频编码排除失败过的硬件加速模式
+        cached_info = appenv.probe_cache.get(source) or {}
+        hwaccel = appenv.hwaccel_cache.choose(
+            self._preset.ffmpeg,
+            self._preset.hardware_accelerate,
+            appenv.hwaccel_cache.video_codec_of(cached_info),
+        )
+
         return Mission(
             preset_id=self._preset.id,
             preset_name=self._preset.name,
@@ -58,12 +68,16 @@ class MissionMaker:
             source=source,
             standard_target=replacer.standard_target,
             overwrite=_overwrite,
-            hardware_accelerate=self._preset.hardware_accelerate or "auto",
+            hardware_accelerate=hwaccel,
             options=general,
             inputs=inputs,
             outputs=outputs,
+            resource_cost=self._preset.resource,
         )
 
+    def is_up_to_date(self, mission: Mission) -> bool:
+        return appenv.output_fingerprints.is_fresh(mission, self._preset.path)
+
     def expand_sources(self, sources: Iterable[str | Path]) -> Generator[Path]:
         yield from self._source_expander.expand(*sources)
 
@@ -123,6 +137,7 @@ class MissionMaker:
                 expanded_sources = list(maker.expand_sources(_sources))
                 task_agent.set_total(len(expanded_sources))
                 task_agent.start()
+                skipped = 0
                 for s in expanded_sources:
                     wanna_quit = False
                     if appenv.really_wanna_quit_event.is_set():
@@ -134,9 +149,18 @@ class MissionMaker:
                         )
                         break
                     m = maker.make_mission(Path(s), external_dir)
-                    result.append(m)
                     task_agent.advance()
+                    if appenv.context.incremental and maker.is_up_to_date(m):
+                        skipped += 1
+                        continue
+                    result.append(m)
                     await appenv.pretending_asleep(0.05)
+                if skipped:
+                    appenv.say(
+                        _(
+                            "预设 {name} 有 {count} 个任务的输出已是最新，已跳过。"
+                        ).format(name=_preset.name, count=skipped)
+                    )
                 await appenv.pretending_asleep(0.2)
                 return result
 
@@ -150,3 +174,69 @@ class MissionMaker:
         missions = list(itertools.chain(*results))
 
         return missions
+
+    @staticmethod
+    def _fan_out_key(mission: Mission) -> tuple:
+        # 只有输出之外的参数完全一致时，才能共用同一次读取和解码
+        return (
+            mission.ffmpeg,
+            str(mission.source),
+            mission.overwrite,
+            mission.hardware_accelerate,
+            tuple(mission.options.iter_arguments("front")),
+            tuple(
+                (str(g.filename), tuple(g.iter_arguments("front")))
+                for g in mission.inputs
+            ),
+        )
+
+    @staticmethod
+    def _merge_missions(missions: list[Mission]) -> Mission:
+        first = missions[0]
+        cost = ResourceCost(0, 0, 0)
+        for m in missions:
+            cost = cost + m.resource_cost
+        return replace(
+            first,
+            preset_id="+".join(m.preset_id for m in missions),
+            preset_name=" + ".join(m.preset_name for m in missions),
+            outputs=[g for m in missions for g in m.outputs],
+            resource_cost=cost,
+        )
+
+    @staticmethod
+    def fan_out(missions: Iterable[Mission]) -> list[Mission]:
+        """把来源相同、输入参数一致的任务合并为一个多输出的任务
+
+        合并后的任务只读取并解码一次源文件，各预设的输出组依次排列。
+        输出文件名冲突的任务不会被合并。合并后的任务保持首个任务的位置。
+        """
+        groups: dict[tuple, list[tuple[int, Mission]]] = {}
+        for index, m in enumerate(missions):
+            groups.setdefault(MissionMaker._fan_out_key(m), []).append((index, m))
+
+        # (首个任务的序号, 待合并的任务)
+        chunks: list[tuple[int, list[Mission]]] = []
+        for group in groups.values():
+            merging: list[Mission] = []
+            first = 0
+            outputs: set[str] = set()
+            for index, m in group:
+                filenames = {str(g.filename) for g in m.outputs}
+                if merging and not (filenames & outputs):
+                    merging.append(m)
+                    outputs |= filenames
+                    continue
+                if merging:
+                    chunks.append((first, merging))
+                merging = [m]
+                first = index
+                outputs = filenames
+            if merging:
+                chunks.append((first, merging))
+
+        chunks.sort(key=lambda x: x[0])
+        return [
+            x[0] if len(x) == 1 else MissionMaker._merge_missions(x)
+            for _index, x in chunks
+        ]
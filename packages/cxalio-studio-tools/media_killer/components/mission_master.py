@@ -1,15 +1,20 @@
 import asyncio
-from collections.abc import Iterable
-from dataclasses import dataclass
+import math
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, replace
 from datetime import datetime
 
 from rich.progress import TaskID
 
-from cx_studio.ffmpeg import FFmpegAsync
-from cx_studio.tui import AsyncCanceller, JobCounter
+from cx_studio.tui import JobCounter
 from cx_tools.i18n import _
+from cx_wealth import WealthLabel
 from .mission import Mission
+from .mission_journal import MissionJournal, MissionState
 from .mission_runner import MissionRunner, MissionPretender
+from .segment_runner import SegmentRunner
+from .resource_pool import ResourceCost, ResourcePool
 from ..appenv import appenv
 
 
@@ -18,29 +23,111 @@ class PoisonError(Exception):
 
 
 class MissionMaster:
+    REFRESH_INTERVAL = 0.2
+
     @dataclass
     class MInfo:
         mission: Mission
         task_id: TaskID
         total: float | None = None
         runner: MissionRunner | None = None
-
-    def __init__(self, missions: Iterable[Mission], max_workers: int | None = None):
+        codec: str | None = None
+
+    def __init__(
+        self,
+        missions: Iterable[Mission],
+        max_workers: int | None = None,
+        probe_workers: int | None = None,
+        budget: ResourceCost | None = None,
+        journal: MissionJournal | None = None,
+    ):
         self._missions = list(missions)
-        self._max_workers = max_workers or 1
+        self._journal = journal
+        self._resource_pool = ResourcePool(
+            budget or ResourceCost(cpu=float(os.cpu_count() or 1), gpu=2, io=2)
+        )
+        self._max_workers = self.count_workers(
+            self._missions, max_workers, self._resource_pool.budget
+        )
+        self._probe_workers = probe_workers or 1
         self._mission_infos: dict[int, MissionMaster.MInfo] = {}
-        self._semaphore = asyncio.Semaphore(self._max_workers)
         self._info_lock = asyncio.Lock()
         self._running_cond = asyncio.Condition()
         self._total_task = appenv.progress.add_task(_("总进度"))
+        self._probe_task = appenv.progress.add_task(_("探测媒体信息"), visible=False)
 
-        self._cancel_one = AsyncCanceller()
+        # 探测完成的任务按原始序号进入队列，保证编码仍尽量按排列顺序进行
+        self._probe_indexes: Iterator[int] = iter(range(len(self._missions)))
+        self._ready_queue: asyncio.PriorityQueue[float] = asyncio.PriorityQueue()
+
+        self._active_infos: dict[int, MissionMaster.MInfo] = {}
+        self._total_time: float = 0
+        self._finished_time: float = 0
+        self._start_time: datetime | None = None
         self._cancel_all_event = asyncio.Event()
 
+    @staticmethod
+    def count_workers(
+        missions: Iterable[Mission], max_workers: int | None, budget: ResourceCost
+    ) -> int:
+        """实际同时运行的任务数上限
+
+        未指定工作线程数时只由资源预算限制：按占用 CPU 最少的任务计算预算最多能容纳的任务数，
+        不占用 CPU 的任务不受 CPU 预算限制。
+        """
+        missions = list(missions)
+        if max_workers:
+            return max_workers
+        if not missions:
+            return 1
+        smallest = min(m.resource_cost.fit(budget).cpu for m in missions)
+        if smallest <= 0:
+            return len(missions)
+        return max(1, min(len(missions), math.ceil(budget.cpu / smallest)))
+
+    def _mark(self, mission: Mission, state: MissionState) -> None:
+        if self._journal is not None:
+            self._journal.mark(mission, state)
+
+    @staticmethod
+    def _check_hwaccel(info: "MissionMaster.MInfo") -> Mission:
+        # 探测后才知道源视频编码，同一批次中刚失败过的硬件加速模式也会被跳过
+        mission = info.mission
+        hwaccel = appenv.hwaccel_cache.choose(
+            mission.ffmpeg, mission.hardware_accelerate, info.codec
+        )
+        if hwaccel != mission.hardware_accelerate:
+            appenv.whisper(
+                _("{name} 改用硬件加速模式 {hwaccel}").format(
+                    name=mission.name, hwaccel=hwaccel
+                )
+            )
+            cost = mission.resource_cost
+            if hwaccel in ("auto", "none"):
+                # 不再指定具体的硬件加速方式时不占用硬件会话，与预设的默认值一致
+                cost = replace(cost, gpu=0)
+            info.mission = replace(
+                mission, hardware_accelerate=hwaccel, resource_cost=cost
+            )
+        return info.mission
+
+    @staticmethod
+    def _count_segments(info: "MissionMaster.MInfo") -> int:
+        if appenv.context.pretending_mode:
+            return 1
+        return SegmentRunner.count_segments(
+            info.mission, appenv.context.segments, info.total
+        )
+
     async def _build_mission_info(self, index: int) -> None:
         mission = self._missions[index]
-        ffmpeg = FFmpegAsync(mission.ffmpeg)
-        basic_info = await ffmpeg.get_basic_info(mission.source)
+        try:
+            basic_info = await appenv.probe_cache.get_basic_info(
+                mission.ffmpeg, mission.source
+            )
+        except OSError:
+            # 探测失败时仍然登记任务，具体错误交由执行阶段报告
+            basic_info = {}
         duration = basic_info.get("duration")
         mission_info = MissionMaster.MInfo(
             mission=mission,
@@ -48,105 +135,191 @@ class MissionMaster:
                 mission.name, total=None, visible=False, start=False
             ),
             total=duration.total_seconds if duration else None,
+            codec=appenv.hwaccel_cache.video_codec_of(basic_info),
         )
 
         async with self._info_lock:
             self._mission_infos[index + 1] = mission_info
+            self._total_time += mission_info.total or 1
 
         if appenv.context.pretending_mode:
             await asyncio.sleep(0.1)
 
-    async def _run_mission(self, index: int) -> None:
-        async with self._semaphore:
+    def _report_error(self, mission: Mission, error: Exception) -> None:
+        # 单个任务的意外错误不应终止工作协程，否则剩余任务会被静默跳过
+        appenv.say(
+            WealthLabel(mission),
+            f"[red]{_('运行异常')}[/]",
+            f"[bright_black]{type(error).__name__}: {error}[/]",
+        )
+        self._mark(mission, "failed")
+
+    async def _probe_worker(self) -> None:
+        for index in self._probe_indexes:
             if self._cancel_all_event.is_set():
-                return
+                break
+            try:
+                await self._build_mission_info(index)
+            except Exception as e:
+                self._report_error(self._missions[index], e)
+                continue
+            finally:
+                appenv.progress.advance(self._probe_task)
+            await self._ready_queue.put(index + 1)
+
+    async def _feed_workers(self, probe_workers: list[asyncio.Task]) -> None:
+        await asyncio.gather(*probe_workers, return_exceptions=True)
+        appenv.progress.update(self._probe_task, visible=False)
+        for _i in range(self._max_workers):
+            await self._ready_queue.put(math.inf)
+
+    async def _encode_worker(self) -> None:
+        while not self._cancel_all_event.is_set():
+            index = await self._ready_queue.get()
+            if math.isinf(index):
+                break
+            info = self._mission_infos[int(index)]
+            try:
+                await self._encode_one(int(index), info)
+            except Exception as e:
+                self._report_error(info.mission, e)
+
+    async def _encode_one(self, index: int, info: "MissionMaster.MInfo") -> None:
+        # 先确定硬件加速模式，再按最终的资源占用申请资源
+        self._check_hwaccel(info)
+        if self._count_segments(info) > 1:
+            # 分段任务由各个分段分别申请资源
+            await self._run_mission(index)
+            return
+        async with self._resource_pool.reserve(info.mission.resource_cost) as acquired:
+            if acquired:
+                await self._run_mission(index)
 
-            mission_info = self._mission_infos[index]
-            mission = mission_info.mission
-            runner = (
-                MissionPretender(mission)
-                if appenv.context.pretending_mode
-                else MissionRunner(mission)
-            )
+    async def _run_mission(self, index: int) -> None:
+        if self._cancel_all_event.is_set():
+            return
 
-            # 记录即将处理的文件列表
-            appenv.input_filesize_counter.add_paths(mission.iter_input_filenames())
+        mission_info = self._mission_infos[index]
+        mission = mission_info.mission
+        segments = self._count_segments(mission_info)
+        if appenv.context.pretending_mode:
+            runner = MissionPretender(mission)
+        elif segments > 1:
+            runner = SegmentRunner(
+                mission, segments, mission_info.total, self._resource_pool
+            )
+        else:
+            runner = MissionRunner(mission)
 
-            async with self._info_lock:
-                self._mission_infos[index].runner = runner
+        # 记录即将处理的文件列表
+        appenv.input_filesize_counter.add_paths(mission.iter_input_filenames())
 
-            t = asyncio.create_task(runner.execute())
+        async with self._info_lock:
+            self._mission_infos[index].runner = runner
+
+        self._active_infos[index] = mission_info
+        if self._start_time is None:
+            self._start_time = datetime.now()
+        appenv.progress.start_task(mission_info.task_id)
+        self._mark(mission, "running")
+        result = None
+        try:
+            # 取消请求由 _watch_interrupts 直接转交给 runner，这里只需等待其结束
+            result = await runner.execute()
+
+            # 记录已处理完成的文件列表
+            appenv.output_filesize_counter.add_paths(mission.iter_output_filenames())
+            if result and not appenv.context.pretending_mode:
+                appenv.output_fingerprints.record(mission)
+        finally:
+            self._mark(mission, "done" if result else "failed")
+            if not result and runner.hwaccel_failed:
+                appenv.hwaccel_cache.record_failure(
+                    mission.ffmpeg, mission_info.codec, mission.hardware_accelerate
+                )
+            self._active_infos.pop(index, None)
+            if runner.done():
+                self._finished_time += runner.task_total or 1
+            appenv.progress.update(mission_info.task_id, visible=False)
+            if appenv.context.pretending_mode:
+                await asyncio.sleep(0.2)
+            appenv.progress.stop_task(mission_info.task_id)
+
+    def _cancel_one(self) -> None:
+        for info in self._active_infos.values():
+            if info.runner and info.runner.is_running():
+                info.runner.cancel()
+                return
 
-            appenv.progress.start_task(mission_info.task_id)
+    async def _cancel_all(self) -> None:
+        self._cancel_all_event.set()
+        await self._resource_pool.close()
+        for info in list(self._active_infos.values()):
+            if info.runner:
+                info.runner.cancel()
+        # 唤醒仍在等待队列的编码线程，让它们自行退出
+        for _i in range(self._max_workers):
+            await self._ready_queue.put(-math.inf)
+
+    async def _watch_interrupts(self) -> None:
+        while not self._cancel_all_event.is_set():
+            wanna_quit = asyncio.create_task(appenv.wanna_quit_event.wait())
+            really_wanna_quit = asyncio.create_task(
+                appenv.really_wanna_quit_event.wait()
+            )
             try:
-                while not t.done():
-                    wanna_quit = await self._cancel_one.is_cancelling_async()
-                    if wanna_quit or self._cancel_all_event.is_set():
-                        runner.cancel()
-                        break
-                    await asyncio.sleep(0.1)
-
-                # await t
-                # 记录已处理完成的文件列表
-                appenv.output_filesize_counter.add_paths(
-                    mission.iter_output_filenames()
+                await asyncio.wait(
+                    [wanna_quit, really_wanna_quit],
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-
-            except asyncio.CancelledError:
-                runner.cancel()
-                # raise
             finally:
-                if appenv.context.pretending_mode:
-                    await asyncio.sleep(0.2)
-                appenv.progress.stop_task(mission_info.task_id)
+                wanna_quit.cancel()
+                really_wanna_quit.cancel()
 
-    async def _update_tasks(self) -> None:
-        mission_count = len(self._missions)
-        total_time = completed_time = 0
-        start_time = datetime.now()
+            if appenv.really_wanna_quit_event.is_set():
+                await self._cancel_all()
+            elif appenv.wanna_quit_event.is_set():
+                appenv.wanna_quit_event.clear()
+                self._cancel_one()
 
-        async with self._info_lock:
-            infos = self._mission_infos.copy()
-
-        jobs = JobCounter(mission_count)
-
-        for index, info in infos.items():
-            jobs.current = index
-            total_time += info.total or 1
+    async def _refresh_tasks(self) -> None:
+        while True:
+            await self._update_tasks()
+            await asyncio.sleep(self.REFRESH_INTERVAL)
 
-            if not info.runner:
+    async def _update_tasks(self) -> None:
+        # 已结束任务的时长在结束时累加进 _finished_time，
+        # 每次刷新只需遍历正在运行的任务
+        completed_time = self._finished_time
+        jobs = JobCounter(len(self._missions))
+
+        for index, info in list(self._active_infos.items()):
+            runner = info.runner
+            if runner is None or not runner.is_running():
                 continue
 
-            runner_start_time = info.runner.task_start_time
-            if runner_start_time is not None and runner_start_time < start_time:
-                start_time = runner_start_time
-
+            jobs.current = index
             desc_str = "[bright_black][{}][{:.2f}x][/][yellow]{}[/]".format(
-                jobs.format(), info.runner.task_speed, info.runner.task_description
+                jobs.format(), runner.task_speed, runner.task_description
             )
-            if info.runner.is_running():
-
-                appenv.progress.update(
-                    info.task_id,
-                    visible=True,
-                    description=desc_str,
-                    completed=info.runner.task_completed,
-                    total=info.runner.task_total,
-                )
+            appenv.progress.update(
+                info.task_id,
+                visible=True,
+                description=desc_str,
+                completed=runner.task_completed,
+                total=runner.task_total,
+            )
+            completed_time += runner.task_completed
 
-                completed_time += info.runner.task_completed
-            else:
-                appenv.progress.update(info.task_id, visible=False)
-                if info.runner.done():
-                    completed_time += info.runner.task_total or 1
-        # for
-        speed = completed_time / (datetime.now() - start_time).total_seconds()
+        now = datetime.now()
+        elapsed = (now - (self._start_time or now)).total_seconds()
+        speed = completed_time / elapsed if elapsed > 0 else 0
         desc_str = f"[bright_black][{speed:.2f}x][/][blue]{_('总体进度')}[/]"
 
         appenv.progress.update(
             self._total_task,
             completed=completed_time,
-            total=total_time,
+            total=self._total_time,
             description=desc_str,
         )
 
@@ -163,42 +336,34 @@ class MissionMaster:
                     self._total_task,
                     start=True,
                     visible=True,
+                    total=None,
+                )
+                appenv.progress.update(
+                    self._probe_task,
+                    visible=True,
                     total=len(self._missions),
                 )
 
-                for index, mission in appenv.progress.track(
-                    enumerate(self._missions), task_id=self._total_task
-                ):
-                    appenv.progress.update(self._total_task, description=mission.name)
-                    await self._build_mission_info(index)
-
+                await appenv.hwaccel_cache.preload(m.ffmpeg for m in self._missions)
+                probe_workers = [
+                    asyncio.create_task(self._probe_worker())
+                    for _i in range(self._probe_workers)
+                ]
+                feeder = asyncio.create_task(self._feed_workers(probe_workers))
                 workers = [
-                    asyncio.create_task(self._run_mission(x))
-                    for x in self._mission_infos
+                    asyncio.create_task(self._encode_worker())
+                    for _i in range(self._max_workers)
                 ]
-
-                while not all(x.done() for x in workers):
-                    if appenv.wanna_quit_event.is_set():
-                        self._cancel_one.cancel()
-                        appenv.wanna_quit_event.clear()
-
-                    if appenv.really_wanna_quit_event.is_set():
-                        self._cancel_all_event.set()
-                        for t in workers:
-                            t.cancel()
-                        done, pending = await asyncio.wait(
-                            workers, return_when=asyncio.ALL_COMPLETED
-                        )
-                        for p in pending:
-                            p.cancel()
-                        await asyncio.sleep(0.1)
-                        break
-
-                    await self._update_tasks()
-                    await asyncio.sleep(0.1)
-                # while checking
-
-                await asyncio.gather(*workers, return_exceptions=True)
+                workers += probe_workers + [feeder]
+
+                watcher = asyncio.create_task(self._watch_interrupts())
+                refresher = asyncio.create_task(self._refresh_tasks())
+                try:
+                    await asyncio.gather(*workers, return_exceptions=True)
+                finally:
+                    watcher.cancel()
+                    refresher.cancel()
+                await self._update_tasks()
 
                 # taskgroup
             # running Condition
@@ -10,19 +10,21 @@ from typing import override
 from cx_studio.core.cx_time import CxTime
 from cx_studio.ffmpeg import FFmpegAsync
 from cx_studio.filesystem import is_executable
+from cx_studio.iotools import LineRingBuffer
 from cx_tools.i18n import _
 from cx_wealth import rich_types as r
 from cx_wealth.indexed_list_panel import IndexedListPanel
 from cx_wealth.wealth_detail import WealthDetailPanel
 from ..appenv import appenv
 from .exception import SafeError
+from .hwaccel_cache import HWAccelCache
 from .mission import Mission
 
 
 class MissionRunner:
     def __init__(self, mission: Mission):
         self.mission = mission
-        self._ffmpeg: FFmpegAsync = FFmpegAsync(self.mission.ffmpeg)
+        self._ffmpeg: FFmpegAsync = FFmpegAsync(self.mission.ffmpeg, progress_mode=True)
         self._input_files = [self.mission.source] + list(
             self.mission.iter_input_filenames()
         )
@@ -40,7 +42,18 @@ class MissionRunner:
         self._start_time: datetime | None = None
         self._end_time: datetime | None = None
         self._running_cond = asyncio.Condition()
-        self._ffmpeg_outputs = []
+        self._hwaccel_error_seen = False
+        self.hwaccel_failed = False
+        # 只保留最后的输出用于报错，调试模式下更早的输出会转存到日志文件，
+        # 日志文件在第一次有输出被丢弃时才创建
+        self._ffmpeg_outputs = LineRingBuffer(
+            max_lines=200,
+            spill_file=(
+                appenv.config_manager.new_log_file
+                if appenv.is_debug_mode_on()
+                else None
+            ),
+        )
 
     def cancel(self):
         # self._canceled = True
@@ -105,8 +118,18 @@ class MissionRunner:
     async def _on_finished(self):
         appenv.say(self.make_line_report(f"[green]{_('完成')}[/]"))
 
+    def _show_outputs(self):
+        appenv.whisper(
+            IndexedListPanel(
+                self._ffmpeg_outputs.lines(),
+                title=_("FFmpeg 输出"),
+                start_index=self._ffmpeg_outputs.dropped + 1,
+            )
+        )
+
     async def _on_terminated(self):
-        appenv.whisper(IndexedListPanel(self._ffmpeg_outputs, title=_("FFmpeg 输出")))
+        self.hwaccel_failed = self._hwaccel_error_seen
+        self._show_outputs()
         appenv.say(self.make_line_report(f"[red]{_('运行异常')}[/]"))
         await self._clean_up()
 
@@ -128,6 +151,19 @@ class MissionRunner:
 
     async def _on_verbose(self, line: str):
         self._ffmpeg_outputs.append(line)
+        if (
+            not self._hwaccel_error_seen
+            and self.mission.hardware_accelerate not in ("", "none")
+            and HWAccelCache.FAILURE_PATTERN.search(line)
+        ):
+            self._hwaccel_error_seen = True
+
+    async def _prefetch_paths(self):
+        # 获得资源后、准备任务前才在线程中并发获取输入输出及其目录的状态，
+        # 准备任务时只需查表，缓存也不会在排队等待资源期间过期
+        paths = {*self._input_files, *self._output_files}
+        paths.update(x.parent for x in self._output_files)
+        await asyncio.to_thread(appenv.path_stat_cache.prefetch, paths)
 
     def _prepare_mission(self):
         conflicts = set(self._input_files) & set(self._output_files)
@@ -140,8 +176,9 @@ class MissionRunner:
                 _("ffmpeg可执行文件无效: {path}").format(path=self._ffmpeg.executable)
             )
 
+        stat_cache = appenv.path_stat_cache
         no_existed_input_files = set(
-            itertools.filterfalse(lambda a: a.exists(), self._input_files)
+            itertools.filterfalse(stat_cache.exists, self._input_files)
         )
         if no_existed_input_files:
             raise SafeError(
@@ -153,18 +190,17 @@ class MissionRunner:
         o_dirs = set(map(lambda a: a.parent, self._output_files))
         invalid_o_dirs = set(
             itertools.filterfalse(
-                lambda a: os.access(a, os.W_OK),
-                filter(lambda a: a.exists(), o_dirs),
+                stat_cache.is_writable_dir,
+                filter(stat_cache.exists, o_dirs),
             )
         )
         if invalid_o_dirs:
             raise SafeError(_("输出目录无效"))
 
-        non_existent_o_dirs = set(itertools.filterfalse(lambda a: a.exists(), o_dirs))
+        non_existent_o_dirs = set(itertools.filterfalse(stat_cache.exists, o_dirs))
         if non_existent_o_dirs:
             self._task_description = _("创建目标文件夹")
-            for x in non_existent_o_dirs:
-                x.mkdir(parents=True, exist_ok=True)
+            stat_cache.make_dirs(non_existent_o_dirs)
             appenv.whisper(
                 IndexedListPanel(non_existent_o_dirs, title=_("自动创建目标文件夹"))
             )
@@ -185,24 +221,27 @@ class MissionRunner:
             result = None
 
             try:
+                await self._prefetch_paths()
                 self._prepare_mission()
 
                 main_task = asyncio.create_task(
                     self._ffmpeg.execute(self.mission.iter_arguments())
                 )
-
-                while not main_task.done():
-                    await asyncio.sleep(0.1)
-                    if self._cancel_event.is_set():
-                        self._ffmpeg.cancel()
-                        self._cancel_event.clear()
-                        break
-
-                # await asyncio.wait([main_task])
-                result = main_task.result()
+                cancel_task = asyncio.create_task(self._cancel_event.wait())
+                try:
+                    await asyncio.wait(
+                        [main_task, cancel_task], return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    cancel_task.cancel()
+                if not main_task.done():
+                    self._ffmpeg.cancel()
+                    self._cancel_event.clear()
+
+                result = await main_task
 
             except asyncio.CancelledError:
-                self.cancel()
+                self._ffmpeg.cancel()
                 result = False
 
             except SafeError as e:
@@ -214,6 +253,7 @@ class MissionRunner:
                 # await asyncio.wait([main_task])
                 self._end_time = datetime.now()
                 await self._ffmpeg.wait_for_complete()
+                self._ffmpeg_outputs.close()
             return result
 
         # running condition
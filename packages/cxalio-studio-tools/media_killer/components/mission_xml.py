@@ -8,6 +8,7 @@ import ulid
 from cx_studio.filesystem import ensure_parents
 from .argument_group import ArgumentGroup
 from .mission import Mission
+from .resource_pool import ResourceCost
 
 
 class MissionXML:
@@ -53,6 +54,11 @@ class MissionXML:
         hwaccel_node = ET.SubElement(mission_node, "hardware_accelerate")
         hwaccel_node.text = mission.hardware_accelerate
 
+        resource_node = ET.SubElement(mission_node, "resource")
+        resource_node.set("cpu", f"{mission.resource_cost.cpu:g}")
+        resource_node.set("gpu", str(mission.resource_cost.gpu))
+        resource_node.set("io", str(mission.resource_cost.io))
+
         options_node = MissionXML._encode_argument_group(mission.options, "options")
         mission_node.append(options_node)
 
@@ -95,27 +101,34 @@ class MissionXML:
 
         def get_subnode_text(name: str) -> str | None:
             subnode = node.find(name)
-            return subnode.text if subnode else None
+            return subnode.text if subnode is not None else None
 
         ffmpeg = get_subnode_text("ffmpeg")
 
         overwrite = get_subnode_text("overwrite") == "YES"
         hardware_accelerate = get_subnode_text("hardware_accelerate")
 
+        resource_node = node.find("resource")
+        resource_cost = ResourceCost.from_dict(
+            resource_node.attrib if resource_node is not None else None
+        )
+
         options_node = node.find("options")
         options = (
-            MissionXML._decode_argument_group(options_node) if options_node else None
+            MissionXML._decode_argument_group(options_node)
+            if options_node is not None
+            else None
         )
 
         inputs = []
         inputs_node = node.find("inputs")
-        if inputs_node:
+        if inputs_node is not None:
             for input_node in inputs_node.findall("argument_group"):
                 inputs.append(MissionXML._decode_argument_group(input_node))
 
         outputs = []
         outputs_node = node.find("outputs")
-        if outputs_node:
+        if outputs_node is not None:
             for output_node in outputs_node.findall("argument_group"):
                 outputs.append(MissionXML._decode_argument_group(output_node))
 
@@ -130,6 +143,7 @@ class MissionXML:
             options=options or ArgumentGroup(),
             inputs=inputs,
             outputs=outputs,
+            resource_cost=resource_cost,
             mission_id=mission_id,
         )
 
@@ -145,6 +159,18 @@ class MissionXML:
         path = ensure_parents(path)
         tree.write(path, encoding="utf-8", xml_declaration=True)
 
+    @staticmethod
+    def iter_file(path: Path) -> Generator[Mission, None, None]:
+        """以流的方式读取任务，每解析完一个任务就释放对应的节点"""
+        root = None
+        for event, node in ET.iterparse(path, events=("start", "end")):
+            if root is None:
+                root = node
+                continue
+            if event == "end" and node.tag == "mission":
+                yield MissionXML.decode_mission_node(node)
+                root.clear()
+
     @classmethod
     def load(cls, path: Path) -> MissionXML:
         tree = ET.parse(path)
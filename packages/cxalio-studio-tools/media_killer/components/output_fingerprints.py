@@ -0,0 +1,68 @@
+import hashlib
+import os
+from pathlib import Path
+
+from cx_studio.filesystem import FileInfoCache
+from .argument_group import ArgumentGroup
+from .mission import Mission
+
+
+class OutputFingerprints:
+    """记录每个输出文件由哪一组参数生成
+
+    指纹由 ffmpeg、通用参数、全部输入组和该输出组的参数计算，
+    与多路输出合并无关。记录存放在 FileInfoCache 中，
+    输出文件被改动后记录随之失效。
+    """
+
+    CACHE_KEY = "mk_output_fingerprint"
+
+    def __init__(self, db_path: Path, max_size: int = 100000):
+        self._cache = FileInfoCache(db_path, max_size)
+
+    @staticmethod
+    def fingerprint(mission: Mission, output: ArgumentGroup) -> str:
+        parts = [str(mission.ffmpeg)]
+        parts += mission.options.iter_arguments("front")
+        for group in mission.inputs:
+            parts += group.iter_arguments("front")
+            parts += ["-i", str(group.filename)]
+        parts += output.iter_arguments("front")
+        parts.append(str(output.filename))
+        return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, mission: Mission, preset_path: Path | None = None) -> bool:
+        """所有输出都存在、比源文件和预设文件新，且生成参数未变时返回 True"""
+        if not mission.outputs:
+            return False
+        try:
+            newest = os.stat(mission.source).st_mtime
+            if preset_path and preset_path.is_file():
+                newest = max(newest, os.stat(preset_path).st_mtime)
+        except OSError:
+            return False
+
+        for output in mission.outputs:
+            if output.filename is None:
+                return False
+            try:
+                if os.stat(output.filename).st_mtime < newest:
+                    return False
+            except OSError:
+                return False
+            recorded = self._cache.get(output.filename, self.CACHE_KEY)
+            if recorded != self.fingerprint(mission, output):
+                return False
+        return True
+
+    def record(self, mission: Mission) -> None:
+        for output in mission.outputs:
+            if output.filename is not None:
+                self._cache.set(
+                    output.filename,
+                    self.CACHE_KEY,
+                    self.fingerprint(mission, output),
+                )
+
+    def close(self) -> None:
+        self._cache.close()
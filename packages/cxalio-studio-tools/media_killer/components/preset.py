@@ -11,6 +11,7 @@ from rich.columns import Columns
 from cx_tools.i18n import _
 from cx_studio import text as tt
 from cx_studio.filesystem import normalize_suffix, force_suffix
+from .resource_pool import ResourceCost
 
 DefaultSuffixes = (
     ".mov .mp4 .mkv .avi .wmv .flv .webm "
@@ -47,6 +48,7 @@ class Preset:
     inputs: list[Box] = field(default_factory=list)
     outputs: list[Box] = field(default_factory=list)
     custom: dict[str, Any] = field(default_factory=dict)
+    resource: ResourceCost = field(default_factory=ResourceCost)
     # raw: DataPackage = Field(default_factory=DataPackage)
     raw: Box = Box()
 
@@ -67,6 +69,13 @@ class Preset:
         }
         return default_suffixes | includes - excludes
 
+    @staticmethod
+    def _get_resource_cost(data: Box) -> ResourceCost:
+        # 指定了具体硬件加速方式的预设默认占用一个硬件会话
+        hwaccel = str(data.general.get("hardware_accelerate") or "").lower()  # type: ignore
+        default = ResourceCost(gpu=0 if hwaccel in ("", "auto", "none") else 1)
+        return ResourceCost.from_dict(data.get("resource"), default)
+
     @classmethod
     def load(cls, filename: Path | str) -> Preset:
         filename = force_suffix(filename, ".toml")
@@ -91,6 +100,7 @@ class Preset:
             inputs=data.input,  # type: ignore
             outputs=data.output,  # type: ignore
             custom=data.custom.to_dict(),  # type: ignore
+            resource=Preset._get_resource_cost(data),
             raw=data,
         )
 
@@ -118,6 +128,7 @@ class Preset:
         yield _("输入参数"), self.inputs
         yield _("输出参数"), self.outputs
         yield _("自定义参数"), self.custom
+        yield _("资源占用"), str(self.resource)
         yield _("原始数据"), self.raw
 
     def __rich_label__(self):
@@ -0,0 +1,77 @@
+from pathlib import Path
+from typing import Any
+
+from cx_studio.core import CxTime, FileSize
+from cx_studio.ffmpeg import FFmpegAsync
+from cx_studio.filesystem import FileInfoCache
+
+
+class ProbeCache:
+    """持久化的 ffmpeg 探测结果缓存
+
+    以 FileInfoCache 为存储，缓存记录随源文件的修改时间、大小和 inode 失效。
+    """
+
+    CACHE_KEY = "ffmpeg_basic_info"
+
+    def __init__(self, db_path: Path, max_size: int = 100000, memory_size: int = 4096):
+        # 同一个源文件在创建任务、排序和执行时都会被查询，使用内存层避免重复读库
+        self._cache = FileInfoCache(db_path, max_size, memory_size=memory_size)
+
+    @staticmethod
+    def _encode(info: dict[str, Any]) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        for key in ("format_name", "file_name", "streams"):
+            if key in info:
+                result[key] = info[key]
+        for key in ("duration", "start_time"):
+            value = info.get(key)
+            if isinstance(value, CxTime):
+                result[key] = value.total_milliseconds
+        bitrate = info.get("bitrate")
+        if isinstance(bitrate, FileSize):
+            result["bitrate"] = bitrate.total_bytes
+        return result
+
+    @staticmethod
+    def _decode(data: dict[str, Any]) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        for key in ("format_name", "file_name", "streams"):
+            if key in data:
+                result[key] = data[key]
+        for key in ("duration", "start_time"):
+            if data.get(key) is not None:
+                result[key] = CxTime.from_milliseconds(data[key])
+        if data.get("bitrate") is not None:
+            result["bitrate"] = FileSize.from_bytes(data["bitrate"])
+        return result
+
+    def get(self, source: Path) -> dict[str, Any] | None:
+        data = self._cache.get(source, self.CACHE_KEY)
+        if not data:
+            return None
+        # 旧版本未能解析出流信息的记录需要重新探测
+        if "streams" not in data:
+            return None
+        return self._decode(data)
+
+    def put(self, source: Path, info: dict[str, Any]) -> None:
+        self._cache.set(source, self.CACHE_KEY, self._encode(info))
+
+    def close(self) -> None:
+        self._cache.close()
+
+    async def get_basic_info(
+        self, ffmpeg_executable: str | Path | None, source: Path
+    ) -> dict[str, Any]:
+        """优先读取缓存，未命中时才启动 ffmpeg 探测并写回缓存"""
+        cached = self.get(source)
+        if cached is not None:
+            return cached
+
+        ffmpeg = FFmpegAsync(ffmpeg_executable)
+        info = await ffmpeg.get_basic_info(source)
+        # 没有探测到时长的结果可能只是 ffmpeg 不可用，不予缓存
+        if "duration" in info:
+            self.put(source, info)
+        return info
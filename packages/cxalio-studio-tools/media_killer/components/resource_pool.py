@@ -0,0 +1,134 @@
+from __future__ import annotations
+import asyncio
+from collections.abc import AsyncGenerator, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class ResourceCost:
+    """任务占用的资源，同时也用来描述调度器的资源预算
+
+    cpu 以核心数为单位，gpu 为硬件编解码会话数，io 为磁盘读写槽位数。
+    """
+
+    cpu: float = 1.0
+    gpu: int = 0
+    io: int = 0
+
+    @classmethod
+    def from_dict(
+        cls, data: Mapping[str, Any] | None, default: ResourceCost | None = None
+    ) -> ResourceCost:
+        default = default or cls()
+        data = data or {}
+        return cls(
+            cpu=float(data.get("cpu", default.cpu)),
+            gpu=int(data.get("gpu", default.gpu)),
+            io=int(data.get("io", default.io)),
+        )
+
+    def fit(self, budget: ResourceCost) -> ResourceCost:
+        """将超出预算的部分压缩到预算之内，保证任何任务都至少能单独运行"""
+        return ResourceCost(
+            cpu=min(self.cpu, budget.cpu),
+            gpu=min(self.gpu, budget.gpu),
+            io=min(self.io, budget.io),
+        )
+
+    def __add__(self, other: ResourceCost) -> ResourceCost:
+        return ResourceCost(
+            cpu=self.cpu + other.cpu,
+            gpu=self.gpu + other.gpu,
+            io=self.io + other.io,
+        )
+
+    def __sub__(self, other: ResourceCost) -> ResourceCost:
+        return ResourceCost(
+            cpu=self.cpu - other.cpu,
+            gpu=self.gpu - other.gpu,
+            io=self.io - other.io,
+        )
+
+    def __le__(self, other: ResourceCost) -> bool:
+        return self.cpu <= other.cpu and self.gpu <= other.gpu and self.io <= other.io
+
+    def __str__(self) -> str:
+        return f"cpu={self.cpu:g} gpu={self.gpu} io={self.io}"
+
+
+class ResourcePool:
+    """按资源预算装箱的异步调度器
+
+    只要剩余资源足够就立即放行，轻量任务可以填满重量任务留下的空隙；
+    但等待中的任务被插队超过 max_bypass 次之后，后来者必须排在它之后，
+    以免重量任务被源源不断的轻量任务饿死。
+    """
+
+    @dataclass
+    class _Ticket:
+        cost: ResourceCost
+        bypassed: int = 0
+
+    def __init__(self, budget: ResourceCost, max_bypass: int = 8):
+        self.budget = budget
+        self.max_bypass = max_bypass
+        self._used = ResourceCost(0, 0, 0)
+        self._cond = asyncio.Condition()
+        self._waiters: list[ResourcePool._Ticket] = []
+        self._closed = False
+
+    @property
+    def used(self) -> ResourceCost:
+        return self._used
+
+    def _is_available(self, ticket: _Ticket) -> bool:
+        if not self._used + ticket.cost <= self.budget:
+            return False
+        for waiter in self._waiters:
+            if waiter is ticket:
+                return True
+            if waiter.bypassed >= self.max_bypass:
+                return False
+        return True
+
+    async def acquire(self, cost: ResourceCost) -> bool:
+        """等待并占用资源，资源池被关闭时返回 False"""
+        ticket = ResourcePool._Ticket(cost.fit(self.budget))
+        async with self._cond:
+            self._waiters.append(ticket)
+            try:
+                await self._cond.wait_for(
+                    lambda: self._closed or self._is_available(ticket)
+                )
+            finally:
+                position = self._waiters.index(ticket)
+                self._waiters.pop(position)
+            if self._closed:
+                return False
+            for waiter in self._waiters[:position]:
+                waiter.bypassed += 1
+            self._used = self._used + ticket.cost
+            return True
+
+    async def release(self, cost: ResourceCost) -> None:
+        cost = cost.fit(self.budget)
+        async with self._cond:
+            self._used = self._used - cost
+            self._cond.notify_all()
+
+    async def close(self) -> None:
+        """唤醒所有等待者并拒绝后续的申请"""
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def reserve(self, cost: ResourceCost) -> AsyncGenerator[bool]:
+        acquired = await self.acquire(cost)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await self.release(cost)
@@ -0,0 +1,289 @@
+import asyncio
+import copy
+import shutil
+import tempfile
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
+import ulid
+
+from cx_tools.i18n import _
+from .argument_group import ArgumentGroup
+from .exception import SafeError
+from .mission import Mission
+from .mission_runner import MissionRunner
+from .resource_pool import ResourcePool
+
+
+class _SegmentPartRunner(MissionRunner):
+    """单个分段的执行器，不单独报告开始与结束"""
+
+    async def _on_started(self):
+        pass
+
+    async def _on_finished(self):
+        pass
+
+    async def _on_terminated(self):
+        self.hwaccel_failed = self._hwaccel_error_seen
+        self._show_outputs()
+        await self._clean_up()
+
+    async def _on_canceled(self, reason: str | None = None):
+        await self._clean_up()
+        if self._cancel_event.is_set():
+            self._cancel_event.clear()
+
+    async def _clean_up(self):
+        # 分段输出位于临时目录中，由父任务统一删除
+        self._ffmpeg_outputs.clear()
+
+
+class SegmentRunner(MissionRunner):
+    """分段并行执行单个较长的任务
+
+    先以流复制的方式在关键帧处把源文件切成若干段，
+    每一段作为子任务分别向资源池申请资源并行编码，
+    最后使用 concat 分离器把各输出的分段按顺序拼接为目标文件。
+    进度和取消都汇总到这个父任务上。
+    """
+
+    MIN_SEGMENT_SECONDS = 30
+    # 这些参数会改变时间轴，切分后再编码的结果与整体编码不一致
+    _TIMING_OPTIONS = {"-ss", "-sseof", "-t", "-to", "-itsoffset"}
+    # 切分时无法识别的流会被忽略，按序号指定的映射可能选错流
+    _MAPPING_OPTIONS = {"-map"}
+
+    def __init__(
+        self,
+        mission: Mission,
+        segments: int,
+        duration: float | None,
+        resource_pool: ResourcePool,
+    ):
+        super().__init__(mission)
+        self._segments = segments
+        self._duration = duration
+        self._resource_pool = resource_pool
+        self._work_dir: Path | None = None
+        self._parts: list[_SegmentPartRunner] = []
+        self._finished_seconds: float = 0
+
+    @classmethod
+    def count_segments(
+        cls, mission: Mission, segments: int, duration: float | None
+    ) -> int:
+        """计算任务应当切分的段数，不适合切分时返回 1"""
+        if segments < 2 or not duration:
+            return 1
+        if len(mission.inputs) != 1 or not mission.outputs:
+            return 1
+        if mission.inputs[0].filename != mission.source:
+            return 1
+        for group in [mission.options, *mission.inputs, *mission.outputs]:
+            keys = {k for k, _v in group.items()}
+            if keys & (cls._TIMING_OPTIONS | cls._MAPPING_OPTIONS):
+                return 1
+        for group in mission.outputs:
+            # 图像序列等无法拼接的输出
+            if group.filename is None or "%" in str(group.filename):
+                return 1
+        return max(1, min(segments, int(duration // cls.MIN_SEGMENT_SECONDS)))
+
+    @property
+    def task_completed(self):
+        return self._finished_seconds + sum(
+            x.task_completed for x in self._parts if x.is_running()
+        )
+
+    @property
+    def task_total(self):
+        return self._duration
+
+    @property
+    def task_speed(self):
+        return sum(x.task_speed for x in self._parts if x.is_running())
+
+    def _cancel_parts(self):
+        for part in self._parts:
+            part.cancel()
+
+    def cancel(self):
+        super().cancel()
+        self._cancel_parts()
+
+    async def _run_ffmpeg(self, arguments: list[str]) -> bool:
+        main_task = asyncio.create_task(self._ffmpeg.execute(arguments))
+        cancel_task = asyncio.create_task(self._cancel_event.wait())
+        try:
+            await asyncio.wait(
+                [main_task, cancel_task], return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            cancel_task.cancel()
+        if not main_task.done():
+            self._ffmpeg.cancel()
+        return await main_task
+
+    def _prepare_segments(self) -> None:
+        self._prepare_mission()
+        if not self.mission.overwrite:
+            existed = [x for x in self.mission.iter_output_filenames() if x.exists()]
+            if existed:
+                raise SafeError(
+                    _("目标文件已存在: {files}").format(
+                        files=";".join(map(str, existed))
+                    )
+                )
+        self._work_dir = Path(
+            tempfile.mkdtemp(
+                prefix=".mk_segments_", dir=self.mission.standard_target.parent
+            )
+        )
+
+    async def _split_source(self) -> list[Path]:
+        assert self._work_dir is not None
+        self._task_description = _("切分源文件")
+        duration = self._duration or 0
+        times = [duration * i / self._segments for i in range(1, self._segments)]
+        pattern = self._work_dir / f"source_%03d{self.mission.source.suffix}"
+        arguments = [
+            "-hide_banner",
+            "-y",
+            "-i",
+            str(self.mission.source),
+            # 保留数据流等所有流，使分段中的流序号与源文件一致
+            "-map",
+            "0",
+            "-ignore_unknown",
+            "-c",
+            "copy",
+            "-f",
+            "segment",
+            "-segment_times",
+            ",".join(f"{x:.3f}" for x in times),
+            "-reset_timestamps",
+            "1",
+            str(pattern),
+        ]
+        if not await self._run_ffmpeg(arguments):
+            return []
+        # 切点会顺延到下一个关键帧，实际段数可能少于预期
+        return sorted(self._work_dir.glob(f"source_*{self.mission.source.suffix}"))
+
+    def _make_part_mission(self, index: int, source: Path) -> Mission:
+        assert self._work_dir is not None
+        input_group = copy.copy(self.mission.inputs[0])
+        input_group.filename = source
+        outputs = []
+        for n, group in enumerate(self.mission.outputs):
+            x: ArgumentGroup = copy.copy(group)
+            suffix = Path(str(group.filename)).suffix
+            x.filename = self._work_dir / f"output{n}_{index:03d}{suffix}"
+            outputs.append(x)
+        return replace(
+            self.mission,
+            mission_id=ulid.new(),
+            source=source,
+            standard_target=outputs[0].filename,
+            overwrite=True,
+            inputs=[input_group],
+            outputs=outputs,
+        )
+
+    async def _encode_parts(self, missions: list[Mission]) -> bool:
+        self._parts = [_SegmentPartRunner(m) for m in missions]
+        self._task_description = self.mission.name
+        failed = asyncio.Event()
+
+        async def work(part: _SegmentPartRunner) -> bool:
+            async with self._resource_pool.reserve(
+                part.mission.resource_cost
+            ) as acquired:
+                if not acquired or self._cancel_event.is_set() or failed.is_set():
+                    return False
+                result = await part.execute()
+                self._finished_seconds += part.task_total or part.task_completed
+                if not result:
+                    # 任何一段失败都没有必要继续
+                    failed.set()
+                    self._cancel_parts()
+                return bool(result)
+
+        results = await asyncio.gather(*[work(x) for x in self._parts])
+        self.hwaccel_failed = any(x.hwaccel_failed for x in self._parts)
+        return all(results)
+
+    async def _concat_parts(self, count: int) -> bool:
+        assert self._work_dir is not None
+        self._task_description = _("拼接分段")
+        for n, group in enumerate(self.mission.outputs):
+            suffix = Path(str(group.filename)).suffix
+            list_file = self._work_dir / f"output{n}.txt"
+            with open(list_file, "w", encoding="utf-8") as fp:
+                for index in range(count):
+                    part = self._work_dir / f"output{n}_{index:03d}{suffix}"
+                    escaped = str(part.resolve()).replace("'", "'\\''")
+                    fp.write(f"file '{escaped}'\n")
+            arguments = [
+                "-hide_banner",
+                "-y" if self.mission.overwrite else "-n",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                str(list_file),
+                "-map",
+                "0",
+                "-c",
+                "copy",
+                str(group.filename),
+            ]
+            if not await self._run_ffmpeg(arguments):
+                return False
+        return True
+
+    async def execute(self):
+        async with self._running_cond:
+            self._ffmpeg.add_listener("verbose", self._on_verbose)
+            self._start_time = datetime.now()
+            result = False
+            try:
+                await self._prefetch_paths()
+                self._prepare_segments()
+                await self._on_started()
+
+                sources = await self._split_source()
+                if sources and not self._cancel_event.is_set():
+                    missions = [
+                        self._make_part_mission(i, x) for i, x in enumerate(sources)
+                    ]
+                    result = await self._encode_parts(missions)
+                if result and not self._cancel_event.is_set():
+                    result = await self._concat_parts(len(sources))
+
+                if self._cancel_event.is_set():
+                    result = False
+                    await self._on_canceled()
+                elif result:
+                    await self._on_finished()
+                else:
+                    await self._on_terminated()
+
+            except asyncio.CancelledError:
+                self.cancel()
+                result = False
+
+            except SafeError as e:
+                await self._on_canceled(reason=e.message)
+                result = False
+
+            finally:
+                self._end_time = datetime.now()
+                await self._ffmpeg.wait_for_complete()
+                self._ffmpeg_outputs.close()
+                if self._work_dir is not None:
+                    shutil.rmtree(self._work_dir, ignore_errors=True)
+            return result
@@ -27,11 +27,13 @@ class MKHelp(WealthHelp):
         )
         trans_opts.add_action(
             "--sort",
-            metavar="source|preset|target|x",
+            metavar="source|preset|target|longest|makespan|x",
             description=tt.auto_unwrap(
                 _(
                     """设置任务的排序模式，在执行任务之前将会按照指定的模式进行排序。
-            四种模式分别为[u]按源文件路径排序[/]、[u]按预设排序[/]、[u]按目标文件路径排序[/]、[u]按输入顺序排序[/]。"""
+            四种基本模式分别为[u]按源文件路径排序[/]、[u]按预设排序[/]、[u]按目标文件路径排序[/]、[u]按输入顺序排序[/]。
+            longest 会先探测媒体时长并让最长的任务最先开始，
+            makespan 则按并行任务数和预设的资源占用模拟分配各个任务，尽量让多个并行任务同时结束。"""
                 )
             ),
         )
@@ -43,6 +45,54 @@ class MKHelp(WealthHelp):
             description=tt.auto_unwrap(_("""
                 设置并行工作进程的数量，默认为 1 。
                 不建议设置大于 2 的数值，除非你知道你在干什么。
+                设置为 0 时将根据资源预算自动决定并行数量。
+                """)),
+        )
+        trans_opts.add_action(
+            "--cpu-budget",
+            "--gpu-sessions",
+            "--io-slots",
+            metavar="NUM",
+            description=tt.auto_unwrap(_("""
+                设置调度器的资源预算，分别为 CPU 核心数（默认为本机核心数）、
+                硬件编解码会话数（默认为 2）和重度磁盘读写槽位数（默认为 2）。
+                预设文件可以在 \\[resource] 中声明每个任务的资源占用。
+                """)),
+        )
+        trans_opts.add_action(
+            "--probe-jobs",
+            metavar="NUM",
+            description=tt.auto_unwrap(_("""
+                设置同时探测媒体信息的进程数量，默认为 4 。
+                探测与转码互不占用名额，已探测完成的任务会立即开始转码。
+                """)),
+        )
+
+        trans_opts.add_action(
+            "--segments",
+            metavar="NUM",
+            description=tt.auto_unwrap(_("""
+                将较长的单个源文件在关键帧处切分为若干段，各段并行编码后再无损拼接，
+                适合在多核机器上处理少量超长的源文件。默认为 0（不切分）。
+                每段至少 30 秒，带有 -ss、-t 等时间参数或 -map 流映射的任务不会被切分。
+                """)),
+        )
+
+        trans_opts.add_action(
+            "--fan-out",
+            description=tt.auto_unwrap(_("""
+                多个预设处理同一个源文件时，把输入参数一致的任务合并为一个 ffmpeg 进程，
+                源文件只读取和解码一次，同时写出各个预设的输出文件。
+                合并后的任务中任何一路输出失败都会导致整个任务失败。
+                """)),
+        )
+
+        trans_opts.add_action(
+            "--incremental",
+            description=tt.auto_unwrap(_("""
+                增量模式下，如果任务的全部输出文件都已存在、比源文件和预设文件新，
+                并且生成它们的参数与上次相同，该任务将被跳过。
+                修改预设中的参数会让旧的输出失效并重新转码。
                 """)),
         )
 
@@ -79,7 +129,7 @@ class MKHelp(WealthHelp):
             "-c",
             "--continue",
             description=_(
-                "加载上次的[u]所有[/]转码任务并重新执行。\n如果想要继续运行未完成的任务，建议附加 -n 选项。"
+                "加载上次运行中[u]未完成[/]的转码任务并重新执行。\n任务的执行状态会随时记录在任务日志中，即使程序被意外终止也可以继续。"
             ),
         )
 